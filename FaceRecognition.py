@@ -9,6 +9,11 @@ import numpy as np
 from PyQt5.QtCore import pyqtSignal, QObject, QThread
 from PyQt5.QtGui import QImage
 
+from face_gallery import FaceGallery
+from face_index import INDEX_PATH
+from encoding_store import load_encodings
+from face_detector import make_detector
+
 
 def encode_pickle(payload: str, file: str):
     data = []
@@ -31,14 +36,13 @@ class FaceRecognitionThread(QThread):
 
     def run(self) -> None:
         print("Loading Encoder File")
-        with open('images/encoded_file.p', 'rb') as f:
-            encode_list_known_with_ids = pickle.load(f)
-
-        encode_list_known, faceIds = encode_list_known_with_ids
+        encode_list_known, faceIds = load_encodings()
         print("Loaded Encoder File.")
 
         known_faces = faceIds
-        known_encodings = encode_list_known
+        gallery = FaceGallery(encode_list_known, faceIds, tolerance=0.6,
+                              index_path=INDEX_PATH)
+        detector = make_detector()
 
         cap = cv2.VideoCapture(self.url)
 
@@ -52,7 +56,7 @@ class FaceRecognitionThread(QThread):
             print(frame.shape)
             frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
 
-            face_locations = face_recognition.face_locations(frame)
+            face_locations = detector.detect(frame)
             face_current_encodings = face_recognition.face_encodings(frame, face_locations)
 
             student_name = "Unknown"
@@ -63,14 +67,10 @@ class FaceRecognitionThread(QThread):
                  # If no face detected, we still might want to show the camera feed
                  pass
 
-            for face_location, face_encoding in zip(face_locations, face_current_encodings):
-                # Compare face encodings with known encodings
-                matches = face_recognition.compare_faces(known_encodings, face_encoding)
-                face_distance = face_recognition.face_distance(known_encodings, face_encoding)
-
-                match_index = np.argmin(face_distance)
+            for face_location, match in zip(face_locations, gallery.match(face_current_encodings)):
+                match_index = match.index
 
-                if matches[match_index]:
+                if match.person_id != "Unknown":
                     print(f"Known face detected: {known_faces[match_index]}")
                     # Check if file exists before reading
                     img_path = f'images/{known_faces[match_index]}.jpg'
@@ -6,6 +6,7 @@ import requests
 import warnings
 import datetime
 import shared_state
+import metrics
 
 # Suppress annoying deprecated warning from old SDK
 warnings.filterwarnings("ignore", category=FutureWarning)
@@ -357,7 +358,8 @@ def get_chat_response_stream(payload: str, user_id: str = "Unknown"):
         discovered_raw = []
         try:
             genai.configure(api_key=key)
-            discovered_raw = [m.name for m in genai.list_models() if 'generateContent' in m.supported_generation_methods]
+            with metrics.timer('llm.list_models'):
+                discovered_raw = [m.name for m in genai.list_models() if 'generateContent' in m.supported_generation_methods]
         except Exception:
             pass
 
@@ -400,6 +402,7 @@ def get_chat_response_stream(payload: str, user_id: str = "Unknown"):
                 print(f"   [Model {model_name}] Trying...")
                 
                 # Try Streaming First
+                requested_at = time.perf_counter()
                 response = model.generate_content(
                     full_prompt,
                     stream=True,
@@ -412,6 +415,8 @@ def get_chat_response_stream(payload: str, user_id: str = "Unknown"):
                 chunk_received = False
                 sentence_buffer = ""
                 for chunk in response:
+                    if not chunk_received:
+                        metrics.record('llm.first_chunk', (time.perf_counter() - requested_at) * 1000)
                     chunk_received = True
                     try:
                         if not chunk.text: continue
@@ -1,5 +1,3 @@
-import os
-import pickle
 from datetime import datetime
 import sys
 import threading
@@ -13,20 +11,15 @@ import face_recognition
 
 from speech_api import speech_to_text_task, listen_tag
 from speaker import speak, is_speaking
+from encoding_store import load_encodings
+from face_detector import make_detector
+from frame_composer import FrameComposer, load_mode_images
 
 imgBackground = cv2.imread('Resources/background.png')
 
 def import_modes() -> list:
-    # Importing the mode images to a list
-    folderModePath = 'Resources/Modes'
-    modePathList = os.listdir(folderModePath)
-    imgModeList = []
-
-    # print(modePathList)
-    for path in sorted(modePathList):
-        imgModeList.append(cv2.imread(os.path.join(folderModePath, path)))
-
-    return imgModeList
+    # Mode images are read from disk once and cached
+    return load_mode_images('Resources/Modes')
 
 
 def import_listen_image(id: str):
@@ -35,9 +28,7 @@ def import_listen_image(id: str):
 
 def import_encodings():
     print('Reading Encoding Files..')
-    with open(r'encoded_file.p', 'rb') as fp:
-        encode_list_known_with_ids = pickle.load(fp)
-    encode_list_known, studentNames = encode_list_known_with_ids
+    encode_list_known, studentNames = load_encodings()
     print("Loaded Encoding File.")
     return encode_list_known, studentNames
 
@@ -87,8 +78,10 @@ def main_task():
     cap = cv2.VideoCapture(0)
 
     imgModeList = import_modes()
+    composer = FrameComposer(imgBackground, imgModeList)
     mode_type = 0
     encode_list_known, studentNames = import_encodings()
+    detector = make_detector()
 
     listen_tag_image = import_listen_image(1)
     listen_off_image = import_listen_image(0)
@@ -119,11 +112,11 @@ def main_task():
         imgS = cv2.resize(img, (0, 0), None, 0.25, 0.25)
         imgS = cv2.cvtColor(imgS, cv2.COLOR_BGR2RGB)
 
-        face_current_frame = face_recognition.face_locations(imgS)
+        face_current_frame = detector.detect(imgS)
         encode_current_frame = face_recognition.face_encodings(imgS, face_current_frame)
 
-        imgBackground[162:162+480, 55:55+640] = img
-        imgBackground[44:44+633, 808:808+414] = imgModeList[mode_type]
+        # Fresh background + mode panel + camera each frame, so old marks don't linger
+        imgBackground = composer.compose(img, mode_type)
 
         # print(f'Listener Tag: {listen_tag}')
         if listen_tag:
@@ -0,0 +1,222 @@
+"""
+Streaming audio output for OMNIS.
+
+Instead of writing every sentence to an .mp3 file and spawning a new
+player for it, TTS audio is played from memory through one long-lived
+player:
+
+- mpg123 (Linux/Pi): a single `mpg123 -` process keeps the ALSA device
+  open and decodes MP3 from its stdin. Audio is piped in as soon as the TTS
+  provider streams it, so playback starts with the first frames and
+  consecutive sentences play back to back without gaps. Output is resampled
+  to one fixed format so the device is never reopened between providers.
+- pygame (no mpg123, e.g. Windows): each clip is buffered in memory and
+  played with pygame.mixer, which stays initialised.
+
+Only whole MP3 frames are forwarded (ID3 tags and garbage are dropped, so
+clips from different providers concatenate cleanly), and their durations
+are added up to know when the audio written so far will have finished
+playing: that is what `busy()` reports.
+"""
+import io
+import os
+import subprocess
+import time
+
+AUDIO_RATE = 44100
+AUDIO_TAIL = 0.3  # seconds of audio still in mpg123/ALSA buffers after the last frame is handed over
+
+# MPEG audio layer III tables, indexed by the header fields
+_BITRATES = {
+    1: (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),   # MPEG-1
+    2: (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),       # MPEG-2 / 2.5
+}
+_SAMPLE_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+
+
+class Mp3Framer:
+    """Splits an MP3 byte stream into whole frames and adds up their play time."""
+
+    def __init__(self):
+        self.buffer = b""
+
+    def reset(self):
+        self.buffer = b""
+
+    def feed(self, data):
+        """Returns (bytes of the complete frames found, their duration in seconds)."""
+        buf = self.buffer + data
+        out, seconds, i = [], 0.0, 0
+        while len(buf) - i >= 10:
+            if buf[i:i + 3] == b"ID3":
+                size = 10 + ((buf[i + 6] & 0x7F) << 21 | (buf[i + 7] & 0x7F) << 14
+                             | (buf[i + 8] & 0x7F) << 7 | (buf[i + 9] & 0x7F))
+                if len(buf) - i < size:
+                    break  # wait for the rest of the tag
+                i += size
+                continue
+            frame = self._frame(buf, i)
+            if frame is None:
+                i += 1  # not a frame header: resync
+                continue
+            length, duration = frame
+            if len(buf) - i < length:
+                break
+            out.append(buf[i:i + length])
+            seconds += duration
+            i += length
+        self.buffer = buf[i:]
+        return b"".join(out), seconds
+
+    @staticmethod
+    def _frame(buf, i):
+        """(length, seconds) of the layer III frame starting at buf[i], or None."""
+        b1, b2 = buf[i + 1], buf[i + 2]
+        if buf[i] != 0xFF or (b1 & 0xE0) != 0xE0 or (b1 >> 1) & 3 != 1:
+            return None
+        version = (b1 >> 3) & 3
+        bitrate_idx, rate_idx = b2 >> 4, (b2 >> 2) & 3
+        if version == 1 or bitrate_idx in (0, 15) or rate_idx == 3:
+            return None
+        mpeg1 = version == 3
+        bitrate = _BITRATES[1 if mpeg1 else 2][bitrate_idx] * 1000
+        rate = _SAMPLE_RATES[version][rate_idx]
+        samples = 1152 if mpeg1 else 576
+        length = samples // 8 * bitrate // rate + ((b2 >> 1) & 1)
+        return length, samples / rate
+
+
+class AudioOutput:
+    def __init__(self, device=None, rate=AUDIO_RATE):
+        """device: ALSA device string for mpg123, or a callable returning one (re-read when the player restarts)."""
+        self.device = device
+        self.rate = rate
+        self.framer = Mp3Framer()
+        self.process = None
+        self.use_pygame = os.name == 'nt'
+        self.clip = []
+        self.clip_seconds = 0.0  # play time of the current clip written so far
+        self.play_until = 0.0  # perf_counter() time the audio written so far finishes
+        self.player_starts = 0
+        self.stops = 0
+
+    # --- mpg123 ---
+    def _player(self):
+        if self.process is not None and self.process.poll() is None:
+            return self.process
+        device = self.device() if callable(self.device) else self.device
+        cmd = ['mpg123', '-q', '-r', str(self.rate), '--stereo']
+        if device:
+            cmd += ['-a', device]
+        try:
+            self.process = subprocess.Popen(cmd + ['-'], stdin=subprocess.PIPE,
+                                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        except FileNotFoundError:
+            print("⚠️ mpg123 not found. Falling back to pygame playback.")
+            self.use_pygame = True
+            return None
+        self.player_starts += 1
+        self.play_until = 0.0
+        return self.process
+
+    def _kill_player(self):
+        if self.process is not None:
+            try:
+                self.process.kill()
+                self.process.wait(timeout=1)
+            except Exception:
+                pass
+            self.process = None
+
+    # --- pygame ---
+    def _play_pygame(self, data, seconds):
+        import pygame
+        if not pygame.mixer.get_init():
+            pygame.mixer.init(frequency=self.rate, size=-16, channels=2, buffer=2048)
+        stops = self.stops
+        self.wait()  # music.play() would cut off the clip still playing
+        if self.stops != stops:
+            return  # stopped while waiting: this clip is stale
+        pygame.mixer.music.load(io.BytesIO(data))
+        pygame.mixer.music.play()
+        self.play_until = time.perf_counter() + seconds
+
+    # --- clips ---
+    def begin(self):
+        """Starts a new clip (one synthesized sentence)."""
+        self.framer.reset()
+        self.clip = []
+        self.clip_seconds = 0.0
+
+    def write(self, data):
+        """
+        Queues MP3 bytes of the current clip for playback.
+        Returns: perf_counter() time the first frame in `data` will be heard, or None if it held no whole frame.
+        """
+        frames, seconds = self.framer.feed(data)
+        if not frames:
+            return None
+        self.clip_seconds += seconds
+        now = time.perf_counter()
+        if not self.use_pygame:
+            player = self._player()
+            if player is not None:
+                starts = max(now, self.play_until)
+                try:
+                    player.stdin.write(frames)
+                    player.stdin.flush()
+                except (BrokenPipeError, OSError):
+                    print("⚠️ Audio player exited. Restarting...")
+                    self._kill_player()
+                    return None
+                self.play_until = starts + seconds
+                return starts
+        self.clip.append((frames, seconds))
+        return max(now, self.play_until)
+
+    def end(self):
+        """Finishes the current clip (the pygame fallback only starts playing here)."""
+        if self.use_pygame and self.clip:
+            data = b"".join(f for f, _ in self.clip)
+            self._play_pygame(data, sum(s for _, s in self.clip))
+        self.clip = []
+
+    def busy(self):
+        if self.use_pygame:
+            try:
+                import pygame
+                if pygame.mixer.get_init() and pygame.mixer.music.get_busy():
+                    return True
+            except Exception:
+                pass
+            return time.perf_counter() < self.play_until
+        return time.perf_counter() < self.play_until + AUDIO_TAIL
+
+    def wait(self, timeout=30.0):
+        deadline = time.perf_counter() + timeout
+        while self.busy() and time.perf_counter() < deadline:
+            time.sleep(0.02)
+
+    def stop(self):
+        """Cuts off everything queued. The next write() starts a fresh player."""
+        self.stops += 1
+        self.clip = []
+        self.framer.reset()
+        if self.use_pygame:
+            try:
+                import pygame
+                if pygame.mixer.get_init():
+                    pygame.mixer.music.stop()
+            except Exception:
+                pass
+        else:
+            self._kill_player()
+        self.play_until = 0.0
+
+    def close(self):
+        if self.process is not None:
+            try:
+                self.process.stdin.close()
+            except Exception:
+                pass
+        self._kill_player()
@@ -0,0 +1,85 @@
+"""
+Benchmark face detector backends on the enrollment photos.
+
+Every photo in images/faces holds exactly one face, so a backend "recalls"
+a photo when it returns at least one box, and every box beyond the first is
+counted as an extra (a rough false-positive signal). Photos are first fitted
+into a 640 px camera-sized frame, then shrunk by each --scales factor to
+mimic the downscaled frames the live loop detects on (0.2 in main.py) and
+faces further from the camera.
+
+Usage: python benchmark_face_detectors.py [--backends hog,haar,mediapipe] [--scales 1.0,0.5,0.2] [--repeat 3]
+"""
+import argparse
+import os
+import time
+
+import cv2
+import numpy as np
+
+from face_detector import DETECTOR_KINDS, _BACKENDS
+from face_enrollment import FACES_DIR, list_face_images
+
+FRAME_DIM = 640
+
+
+def load_frames(faces_dir):
+    frames = []
+    for filename in list_face_images(faces_dir):
+        img = cv2.imread(os.path.join(faces_dir, filename))
+        if img is None:
+            continue
+        scale = FRAME_DIM / max(img.shape[:2])
+        img = cv2.resize(img, (0, 0), None, scale, scale, interpolation=cv2.INTER_AREA)
+        frames.append(cv2.cvtColor(img, cv2.COLOR_BGR2RGB))
+    return frames
+
+
+def bench(detector, frames, repeat):
+    times, found, extras = [], 0, 0
+    detector.detect(frames[0])  # warm-up (model load, first-call allocations)
+    for rgb in frames:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            boxes = detector.detect(rgb)
+            times.append((time.perf_counter() - start) * 1000)
+        found += bool(boxes)
+        extras += max(0, len(boxes) - 1)
+    return float(np.mean(times)), float(np.percentile(times, 95)), found / len(frames), extras
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--faces-dir', default=FACES_DIR)
+    parser.add_argument('--backends', default=','.join(DETECTOR_KINDS),
+                        help="comma separated, from: " + ', '.join(DETECTOR_KINDS))
+    parser.add_argument('--scales', default='1.0,0.5,0.2')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    frames = load_frames(args.faces_dir)
+    if not frames:
+        print(f"No images found in {args.faces_dir}")
+        return
+    scales = [float(s) for s in args.scales.split(',')]
+    print(f"{len(frames)} photos, fitted to {FRAME_DIM}px\n")
+    print(f"{'backend':>10} {'scale':>6} {'frame':>9} {'mean ms':>8} {'p95 ms':>8} {'recall':>7} {'extra':>6}")
+    print("-" * 60)
+
+    for name in args.backends.split(','):
+        name = name.strip()
+        try:
+            detector = _BACKENDS[name]()
+        except Exception as e:
+            print(f"{name:>10}  unavailable: {e}")
+            continue
+        for scale in scales:
+            scaled = [cv2.resize(f, (0, 0), None, scale, scale, interpolation=cv2.INTER_AREA) if scale != 1.0 else f
+                      for f in frames]
+            h, w = scaled[0].shape[:2]
+            mean_ms, p95_ms, recall, extras = bench(detector, scaled, args.repeat)
+            print(f"{name:>10} {scale:>6.2f} {f'{w}x{h}':>9} {mean_ms:>8.1f} {p95_ms:>8.1f} {recall:>7.0%} {extras:>6}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""
+Benchmark face gallery lookup latency for exact vs IVF indexes.
+
+Uses synthetic 128-d encodings (the same scale as dlib face encodings) at
+several roster sizes and reports per-frame lookup latency and recall@1
+against the exact scan for a few n_probe settings.
+
+Usage: python benchmark_face_index.py [--queries 4] [--repeat 200]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from face_index import BruteForceIndex, IVFIndex
+
+SIZES = [100, 1000, 10000]
+N_PROBES = [1, 4, 8, 16]
+
+
+def synthetic_gallery(n, rng):
+    # dlib encodings are roughly unit-ish vectors with small per-dimension values
+    centers = rng.normal(0, 0.09, (max(1, n // 50), 128))
+    rows = centers[rng.integers(0, len(centers), n)] + rng.normal(0, 0.05, (n, 128))
+    return rows.astype(np.float32)
+
+
+def time_search(index, queries, repeat):
+    index.search(queries, k=2)  # warm-up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        index.search(queries, k=2)
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--queries', type=int, default=4, help="faces per frame")
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'N':>7} {'index':>12} {'ms/frame':>10} {'recall@1':>9}")
+    print("-" * 42)
+
+    for n in SIZES:
+        matrix = synthetic_gallery(n, rng)
+        picks = rng.integers(0, n, args.queries)
+        queries = (matrix[picks] + rng.normal(0, 0.03, (args.queries, 128))).astype(np.float32)
+
+        exact = BruteForceIndex(matrix)
+        _, truth = exact.search(queries, k=1)
+        print(f"{n:>7} {'exact':>12} {time_search(exact, queries, args.repeat):>10.3f} {1.0:>9.2f}")
+
+        start = time.perf_counter()
+        ivf = IVFIndex(matrix).build()
+        build_ms = (time.perf_counter() - start) * 1000
+
+        for n_probe in N_PROBES:
+            if n_probe > ivf.n_lists:
+                continue
+            ivf.n_probe = n_probe
+            _, found = ivf.search(queries, k=1)
+            recall = float(np.mean(found[:, 0] == truth[:, 0]))
+            label = f"ivf/p{n_probe}"
+            print(f"{n:>7} {label:>12} {time_search(ivf, queries, args.repeat):>10.3f} {recall:>9.2f}")
+        print(f"{'':>7} (ivf build: {ivf.n_lists} lists in {build_ms:.0f} ms)")
+
+
+if __name__ == '__main__':
+    main()
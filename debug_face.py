@@ -1,6 +1,6 @@
 import cv2
 import face_recognition
-import pickle
+from encoding_store import load_encodings
 import numpy as np
 
 print("="*50)
@@ -9,10 +9,8 @@ print("="*50)
 
 # 1. Try to load encodings
 try:
-    print("Loading encoded_file.p...", end="")
-    with open(r'encoded_file.p', 'rb') as f:
-        encode_list_known_with_ids = pickle.load(f)
-    known_encodings, known_names = encode_list_known_with_ids
+    print("Loading encoding store...", end="")
+    known_encodings, known_names = load_encodings()
     print(f" ✅ Success!")
     print(f"Known People: {known_names}")
 except Exception as e:
@@ -0,0 +1,159 @@
+"""
+Display subsystem for OMNIS.
+
+Decides which loop iterations are actually rendered and shown, so the
+window doesn't eat the CPU that perception and speech need:
+
+- target FPS (DISPLAY_FPS) while someone is in frame or OMNIS is talking
+- idle FPS (DISPLAY_IDLE_FPS) when nobody is there
+- headless (OMNIS_HEADLESS=1): no window at all; a JSON status snapshot is
+  written to OMNIS_STATUS_FILE and/or sent as UDP datagrams to
+  OMNIS_STATUS_UDP (host:port) instead
+
+Also keeps loop/render FPS and smoothed per-stage timings for the status bar.
+"""
+import json
+import os
+import socket
+import time
+
+import cv2
+
+import metrics
+
+DISPLAY_FPS = float(os.environ.get('DISPLAY_FPS', '15'))
+DISPLAY_IDLE_FPS = float(os.environ.get('DISPLAY_IDLE_FPS', '3'))
+HEADLESS = os.environ.get('OMNIS_HEADLESS', '0') != '0'
+STATUS_FILE = os.environ.get('OMNIS_STATUS_FILE', '')
+STATUS_UDP = os.environ.get('OMNIS_STATUS_UDP', '')  # e.g. "127.0.0.1:9999"
+STATUS_INTERVAL = 1.0  # seconds between published snapshots
+PERF_TEXT_INTERVAL = 0.5  # seconds between refreshes of the on-screen timings
+TIMING_SMOOTHING = 0.1
+
+
+class StageTimer:
+    """
+    Exponentially smoothed milliseconds per named stage of one loop iteration.
+    Every sample also goes to the metrics histogram "<prefix>.<stage>".
+    """
+
+    def __init__(self, smoothing=TIMING_SMOOTHING, prefix='loop'):
+        self.smoothing = smoothing
+        self.prefix = prefix
+        self.ms = {}
+        self._last = None
+
+    def start(self):
+        self._last = time.perf_counter()
+
+    def mark(self, stage):
+        now = time.perf_counter()
+        if self._last is not None:
+            elapsed = (now - self._last) * 1000
+            prev = self.ms.get(stage)
+            self.ms[stage] = elapsed if prev is None else prev + self.smoothing * (elapsed - prev)
+            metrics.record(f"{self.prefix}.{stage}", elapsed)
+        self._last = now
+
+    def summary(self, stages=None):
+        return ' '.join(f"{s} {self.ms[s]:.1f}" for s in (stages or self.ms) if s in self.ms)
+
+
+class RateCounter:
+    def __init__(self, window=1.0):
+        self.window = window
+        self.count = 0
+        self.started = time.time()
+        self.rate = 0.0
+
+    def tick(self):
+        self.count += 1
+        now = time.time()
+        if now - self.started >= self.window:
+            self.rate = self.count / (now - self.started)
+            self.count, self.started = 0, now
+
+
+class Display:
+    def __init__(self, window_name="Face Attendance", target_fps=DISPLAY_FPS, idle_fps=DISPLAY_IDLE_FPS,
+                 headless=HEADLESS, status_file=STATUS_FILE, status_udp=STATUS_UDP):
+        self.window_name = window_name
+        self.target_fps = target_fps
+        self.idle_fps = idle_fps
+        self.headless = headless
+        self.status_file = status_file
+        self.last_render = 0.0
+        self.last_publish = 0.0
+        self.loop_rate = RateCounter()
+        self.render_rate = RateCounter()
+        self.timer = StageTimer()
+        self._perf_text, self._perf_time = "", 0.0
+
+        self.udp, self.udp_addr = None, None
+        if status_udp:
+            host, port = status_udp.rsplit(':', 1)
+            self.udp = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self.udp_addr = (host, int(port))
+
+        if self.headless:
+            print("🖥️ Headless mode: no window" + (f", status -> {status_file}" if status_file else "")
+                  + (f", status -> udp://{status_udp}" if status_udp else ""))
+
+    def should_render(self, active=True, now=None):
+        """True if this iteration should be drawn and shown (never in headless mode)."""
+        self.loop_rate.tick()
+        if self.headless:
+            return False
+        now = now or time.time()
+        fps = self.target_fps if active else self.idle_fps
+        if fps > 0 and now - self.last_render < 1.0 / fps:
+            return False
+        self.last_render = now
+        return True
+
+    def show(self, canvas):
+        """Shows a rendered frame. Returns the key pressed (or -1)."""
+        self.render_rate.tick()
+        cv2.imshow(self.window_name, canvas)
+        return cv2.waitKey(1)
+
+    def perf_text(self):
+        """'render/loop fps | stage ms ...', refreshed twice a second so it stays readable."""
+        now = time.time()
+        if now - self._perf_time >= PERF_TEXT_INTERVAL:
+            self._perf_time = now
+            self._perf_text = (f"{self.render_rate.rate:.0f}/{self.loop_rate.rate:.0f} fps | "
+                               + self.timer.summary())
+        return self._perf_text
+
+    def publish(self, status, now=None):
+        """Writes/sends a JSON status snapshot, at most once per STATUS_INTERVAL."""
+        if not (self.status_file or self.udp):
+            return
+        now = now or time.time()
+        if now - self.last_publish < STATUS_INTERVAL:
+            return
+        self.last_publish = now
+        snapshot = dict(status, time=now, loop_fps=round(self.loop_rate.rate, 1),
+                        render_fps=round(self.render_rate.rate, 1),
+                        timings_ms={k: round(v, 2) for k, v in self.timer.ms.items()})
+        payload = json.dumps(snapshot)
+        if self.status_file:
+            try:
+                tmp = self.status_file + '.tmp'
+                with open(tmp, 'w', encoding='utf-8') as f:
+                    f.write(payload)
+                os.replace(tmp, self.status_file)
+            except OSError as e:
+                print(f"⚠️ Could not write status file: {e}")
+        if self.udp:
+            try:
+                self.udp.sendto(payload.encode('utf-8'), self.udp_addr)
+            except OSError:
+                pass
+
+    def close(self):
+        if self.udp:
+            self.udp.close()
+        if not self.headless:
+            cv2.destroyAllWindows()
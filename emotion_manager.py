@@ -1,3 +1,6 @@
+import time
+from collections import Counter, deque
+
 import cv2
 import numpy as np
 try:
@@ -6,6 +9,34 @@ try:
 except ImportError:
     HAS_MEDIAPIPE = False
 
+# Padding around a face box before it goes through FaceMesh, and the crop size FaceMesh works at
+CROP_PAD = 0.3
+CROP_MAX_DIM = 192
+MOOD_WINDOW = 3.0  # seconds of per-person history a smoothed mood is voted from
+
+
+def mood_key(person_id, track_id):
+    """Who a mood belongs to: the person's ID once known, otherwise the face track."""
+    return person_id if person_id != "Unknown" else f"track:{track_id}"
+
+
+def mood_from_landmarks(lm):
+    """Smile heuristic on one FaceMesh landmark list. Returns: emotion_name (str)"""
+    # Landmark 61: Left mouth corner, 291: Right mouth corner
+    # Mouth width
+    m_width = abs(lm[61].x - lm[291].x)
+    # Face width (approx between ears/cheeks 234 and 454)
+    f_width = abs(lm[234].x - lm[454].x)
+
+    ratio = m_width / f_width if f_width > 0 else 0
+
+    # Heuristic threshold for a smile
+    if ratio > 0.40:
+        return "Happy"
+    # ratio < 0.32 may be sad or just tight-lipped; for now, just Neutral
+    return "Neutral"
+
+
 class EmotionManager:
     def __init__(self):
         self.enabled = HAS_MEDIAPIPE
@@ -17,6 +48,12 @@ class EmotionManager:
                 min_detection_confidence=0.5,
                 min_tracking_confidence=0.5
             )
+            # Crops jump between people, so the crop mesh can't rely on frame-to-frame tracking
+            self.crop_mesh = self.mp_face_mesh.FaceMesh(
+                static_image_mode=True,
+                max_num_faces=1,
+                min_detection_confidence=0.5,
+            )
         
     def detect_emotion(self, frame):
         """
@@ -31,28 +68,72 @@ class EmotionManager:
 
         if results.multi_face_landmarks:
             for face_landmarks in results.multi_face_landmarks:
-                # Landmark 61: Left mouth corner, 291: Right mouth corner
-                # Landmark 0: Upper lip center, 17: Lower lip center
-                lm = face_landmarks.landmark
-                
-                # Simple Smile Heuristic: Mouth Width vs Face Width
-                # Mouth width
-                m_width = abs(lm[61].x - lm[291].x)
-                # Face width (approx between ears/cheeks 234 and 454)
-                f_width = abs(lm[234].x - lm[454].x)
-                
-                ratio = m_width / f_width if f_width > 0 else 0
-                
-                # Heuristic threshold for a smile
-                if ratio > 0.40:
-                    emotion = "Happy"
-                elif ratio < 0.32:
-                    # Maybe sad if very small? Or just tight-lipped.
-                    # For now, just Neutral.
-                    emotion = "Neutral"
+                emotion = mood_from_landmarks(face_landmarks.landmark)
                     
         return emotion
 
+    def detect_emotions(self, frame, faces):
+        """
+        Runs FaceMesh only on padded crops around faces that were already found.
+        frame: full RGB frame
+        faces: list of (key, (top, right, bottom, left)) in `frame` coordinates
+        Returns: {key: emotion_name} for every face the mesh could fit
+        """
+        if not self.enabled or not faces:
+            return {}
+
+        h, w = frame.shape[:2]
+        moods = {}
+        for key, (top, right, bottom, left) in faces:
+            pad_y, pad_x = (bottom - top) * CROP_PAD, (right - left) * CROP_PAD
+            y0, x0 = max(0, int(top - pad_y)), max(0, int(left - pad_x))
+            y1, x1 = min(h, int(bottom + pad_y)), min(w, int(right + pad_x))
+            if y1 - y0 < 8 or x1 - x0 < 8:
+                continue
+            crop = frame[y0:y1, x0:x1]
+            scale = CROP_MAX_DIM / max(crop.shape[:2])
+            if scale < 1:
+                crop = cv2.resize(crop, (0, 0), None, scale, scale, interpolation=cv2.INTER_AREA)
+
+            results = self.crop_mesh.process(np.ascontiguousarray(crop))
+            if results.multi_face_landmarks:
+                moods[key] = mood_from_landmarks(results.multi_face_landmarks[0].landmark)
+        return moods
+
+
+class MoodSmoother:
+    """Majority vote over each person's moods from the last `window` seconds."""
+
+    def __init__(self, window=MOOD_WINDOW):
+        self.window = window
+        self.history = {}  # key -> deque of (timestamp, mood)
+
+    def update(self, moods, now=None):
+        now = now or time.time()
+        for key, mood in moods.items():
+            self.history.setdefault(key, deque()).append((now, mood))
+        for key in list(self.history):
+            samples = self.history[key]
+            while samples and now - samples[0][0] > self.window:
+                samples.popleft()
+            if not samples:
+                del self.history[key]
+
+    def mood(self, key, default="Neutral"):
+        samples = self.history.get(key)
+        if not samples:
+            return default
+        counts = Counter(m for _, m in samples)
+        best = max(counts.values())
+        # Ties go to the most recent of the tied moods
+        for _, m in reversed(samples):
+            if counts[m] == best:
+                return m
+
+    def snapshot(self):
+        return {key: self.mood(key) for key in self.history}
+
+
 if __name__ == "__main__":
     cap = cv2.VideoCapture(0)
     em = EmotionManager()
@@ -0,0 +1,244 @@
+"""
+Compact binary store for known face encodings.
+
+Replaces the pickled `[encodings, ids]` lists (images/encoded_file.p and the
+voice registrations' encoded_file.p) with a versioned directory that loads
+zero-copy through np.memmap:
+
+    images/encodings/
+        header.json   format/version, dim, count, ids_bytes, content hash
+        matrix.f32    count x 128 float32 rows, row i belongs to line i of ids.txt
+        ids.txt       one person ID per line
+        sources.json  optional: image file -> hash/mtime/row, for incremental rebuilds
+
+header.json is always written last, so a crash half way through an append
+leaves the previous `count` in place and the partial row is simply ignored.
+The content hash is a chain (hash of previous hash + new row + new ID), so
+appending one person is O(1) and never rewrites the existing rows.
+"""
+import hashlib
+import json
+import os
+import pickle
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STORE_DIR = os.path.join(BASE_DIR, 'images', 'encodings')
+# Pickled [encodings, ids] lists of earlier versions: EncodeGenerator wrote the
+# first, voice registration (register_face.py) the second
+LEGACY_PICKLES = (
+    os.path.join(BASE_DIR, 'images', 'encoded_file.p'),
+    os.path.join(BASE_DIR, 'encoded_file.p'),
+)
+
+FORMAT_NAME = "omnis-encodings"
+FORMAT_VERSION = 1
+ENCODING_DIM = 128
+ROW_BYTES = ENCODING_DIM * 4
+EMPTY_HASH = hashlib.sha1(FORMAT_NAME.encode()).hexdigest()
+
+
+def _clean_id(person_id):
+    return ' '.join(str(person_id).splitlines()).strip()
+
+
+def _chain_hash(prev_hash, row, person_id):
+    h = hashlib.sha1(prev_hash.encode())
+    h.update(np.ascontiguousarray(row, dtype=np.float32).tobytes())
+    h.update(person_id.encode('utf-8'))
+    return h.hexdigest()
+
+
+class EncodingStore:
+    def __init__(self, path=STORE_DIR):
+        self.path = path
+        self.header_path = os.path.join(path, 'header.json')
+        self.matrix_path = os.path.join(path, 'matrix.f32')
+        self.ids_path = os.path.join(path, 'ids.txt')
+        self.sources_path = os.path.join(path, 'sources.json')
+
+    def exists(self):
+        return os.path.exists(self.header_path)
+
+    def read_header(self):
+        with open(self.header_path, 'r', encoding='utf-8') as f:
+            header = json.load(f)
+        if header.get('format') != FORMAT_NAME:
+            raise ValueError(f"{self.header_path} is not an encoding store")
+        if header.get('version') != FORMAT_VERSION:
+            raise ValueError(f"Unsupported encoding store version {header.get('version')}")
+        if header.get('dim') != ENCODING_DIM:
+            raise ValueError(f"Unexpected encoding dimension {header.get('dim')}")
+        return header
+
+    def _write_header(self, count, ids_bytes, content_hash):
+        header = {
+            "format": FORMAT_NAME,
+            "version": FORMAT_VERSION,
+            "dim": ENCODING_DIM,
+            "dtype": "float32",
+            "count": count,
+            "ids_bytes": ids_bytes,
+            "hash": content_hash,
+        }
+        tmp = self.header_path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(header, f, indent=2)
+        os.replace(tmp, self.header_path)
+        return header
+
+    def load(self, verify=False):
+        """
+        Memory-maps the stored encodings.
+        Returns: (matrix, ids) where matrix is a read-only (N, 128) float32 memmap
+        """
+        header = self.read_header()
+        count = header['count']
+
+        with open(self.ids_path, 'rb') as f:
+            ids = f.read(header['ids_bytes']).decode('utf-8').splitlines()
+        if len(ids) != count:
+            raise ValueError(f"Encoding store has {count} rows but {len(ids)} ids")
+
+        if count == 0:
+            matrix = np.zeros((0, ENCODING_DIM), dtype=np.float32)
+        else:
+            matrix = np.memmap(self.matrix_path, dtype=np.float32, mode='r', shape=(count, ENCODING_DIM))
+
+        if verify and self._hash_rows(matrix, ids) != header['hash']:
+            raise ValueError("Encoding store content hash mismatch")
+        return matrix, ids
+
+    def _hash_rows(self, matrix, ids):
+        h = EMPTY_HASH
+        for row, person_id in zip(matrix, ids):
+            h = _chain_hash(h, row, person_id)
+        return h
+
+    def write(self, encodings, ids):
+        """Replaces the whole store with `encodings` / `ids`."""
+        os.makedirs(self.path, exist_ok=True)
+        matrix = np.asarray(encodings, dtype=np.float32).reshape(-1, ENCODING_DIM)
+        ids = [_clean_id(i) for i in ids]
+        if len(ids) != matrix.shape[0]:
+            raise ValueError(f"{matrix.shape[0]} encodings but {len(ids)} ids")
+
+        # Invalidate first so a crash mid-write never pairs the old header with new data
+        if self.exists():
+            self._write_header(0, 0, EMPTY_HASH)
+
+        ids_blob = ''.join(f"{i}\n" for i in ids).encode('utf-8')
+        for path, blob in ((self.matrix_path, matrix.tobytes()), (self.ids_path, ids_blob)):
+            tmp = path + '.tmp'
+            with open(tmp, 'wb') as f:
+                f.write(blob)
+            os.replace(tmp, path)
+
+        return self._write_header(len(ids), len(ids_blob), self._hash_rows(matrix, ids))
+
+    def read_sources(self):
+        """Returns {filename: {"id", "sha1", "mtime_ns", "size", "row"}} recorded by the last build."""
+        if not os.path.exists(self.sources_path):
+            return {}
+        try:
+            with open(self.sources_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (ValueError, OSError) as e:
+            print(f"⚠️ Ignoring unreadable {self.sources_path} ({e})")
+            return {}
+
+    def write_sources(self, sources):
+        os.makedirs(self.path, exist_ok=True)
+        tmp = self.sources_path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(sources, f, indent=1, sort_keys=True)
+        os.replace(tmp, self.sources_path)
+
+    def append(self, encoding, person_id):
+        """Adds one identity without touching existing rows. Returns the new row count."""
+        return self.extend([encoding], [person_id])
+
+    def extend(self, encodings, ids):
+        """Adds a batch of identities without touching existing rows (one fsync per file). Returns the new row count."""
+        if not self.exists():
+            self.write(np.zeros((0, ENCODING_DIM), dtype=np.float32), [])
+
+        header = self.read_header()
+        count, ids_bytes = header['count'], header['ids_bytes']
+        rows = np.asarray(encodings, dtype=np.float32).reshape(-1, ENCODING_DIM)
+        ids = [_clean_id(i) for i in ids]
+        if len(ids) != rows.shape[0]:
+            raise ValueError(f"{rows.shape[0]} encodings but {len(ids)} ids")
+        lines = ''.join(f"{i}\n" for i in ids).encode('utf-8')
+
+        # Write at the committed end (dropping any tail left by an interrupted append)
+        for path, offset, blob in ((self.matrix_path, count * ROW_BYTES, rows.tobytes()),
+                                   (self.ids_path, ids_bytes, lines)):
+            with open(path, 'r+b' if os.path.exists(path) else 'wb') as f:
+                f.seek(offset)
+                f.write(blob)
+                f.truncate()
+                f.flush()
+                os.fsync(f.fileno())
+
+        content_hash = header['hash']
+        for row, person_id in zip(rows, ids):
+            content_hash = _chain_hash(content_hash, row, person_id)
+        self._write_header(count + len(ids), ids_bytes + len(lines), content_hash)
+        return count + len(ids)
+
+
+def migrate_legacy(store, legacy_paths=LEGACY_PICKLES):
+    """
+    Adds the entries of the legacy pickles that `store` doesn't hold yet
+    (same ID and encoding). Safe to run repeatedly, so the pickles only need
+    to be deleted once this has succeeded.
+    Returns: number of rows added
+    """
+    legacy = [p for p in legacy_paths if os.path.exists(p)]
+    if not legacy:
+        return 0
+    if store.exists():
+        matrix, known = store.load()
+        matrix, known = np.array(matrix), list(known)  # copy: the store is rewritten below
+    else:
+        matrix, known = np.zeros((0, ENCODING_DIM), dtype=np.float32), []
+    have = {}
+    for row, person_id in zip(matrix, known):
+        have.setdefault(person_id, []).append(row)
+
+    added_rows, added_ids = [], []
+    for legacy_path in legacy:
+        print(f"Migrating {legacy_path} to binary encoding store...")
+        with open(legacy_path, 'rb') as f:
+            encodings, legacy_ids = pickle.load(f)
+        for encoding, person_id in zip(encodings, legacy_ids):
+            row = np.asarray(encoding, dtype=np.float32).reshape(ENCODING_DIM)
+            person_id = _clean_id(person_id)
+            if any(np.allclose(row, r) for r in have.get(person_id, ())):
+                continue
+            have.setdefault(person_id, []).append(row)
+            added_rows.append(row)
+            added_ids.append(person_id)
+
+    if added_ids or not store.exists():
+        added = np.asarray(added_rows, dtype=np.float32).reshape(-1, ENCODING_DIM)
+        store.write(np.vstack([matrix, added]), known + added_ids)
+    return len(added_ids)
+
+
+def load_encodings(path=STORE_DIR, legacy_paths=LEGACY_PICKLES):
+    """
+    Loads known encodings for any entry point.
+    Migrates the legacy pickles into the binary store the first time it is needed.
+    Returns: (matrix, ids); an empty (0, 128) matrix if nothing is enrolled yet
+    """
+    store = EncodingStore(path)
+    if store.exists():
+        return store.load()
+
+    if migrate_legacy(store, legacy_paths) or store.exists():
+        return store.load()
+
+    return np.zeros((0, ENCODING_DIM), dtype=np.float32), []
@@ -0,0 +1,218 @@
+"""
+Pluggable face detectors for OMNIS.
+
+Every backend takes an RGB image and returns face boxes in
+face_recognition's (top, right, bottom, left) order, in that image's pixel
+coordinates, clipped to the frame and sorted largest first, so any of them
+can feed face_recognition.face_encodings and the tracker unchanged.
+
+Backends:
+- hog:       dlib HOG via face_recognition (the original detector)
+- cnn:       dlib CNN via face_recognition (accurate, far too slow without CUDA)
+- haar:      OpenCV Haar cascade (ships with cv2, very fast, more false positives)
+- yunet:     OpenCV FaceDetectorYN (needs the YuNet .onnx model, FACE_YUNET_MODEL)
+- dnn:       OpenCV DNN res10 SSD (needs the Caffe prototxt + model, FACE_DNN_PROTO / FACE_DNN_MODEL)
+- mediapipe: MediaPipe face detection (already used for gestures; fast on a Pi)
+
+Selection (env vars):
+    FACE_DETECTOR   auto | hog | cnn | haar | yunet | dnn | mediapipe   (default: auto)
+                    'auto' picks mediapipe, then yunet (if its model is present), then hog
+"""
+import os
+
+import cv2
+import face_recognition
+
+try:
+    import mediapipe as mp
+    HAS_MEDIAPIPE = True
+except ImportError:
+    HAS_MEDIAPIPE = False
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODELS_DIR = os.path.join(BASE_DIR, 'models')
+
+DETECTOR_KIND = os.environ.get('FACE_DETECTOR', 'auto').lower()
+DETECTOR_MIN_SCORE = float(os.environ.get('FACE_DETECTOR_MIN_SCORE', '0.6'))
+YUNET_MODEL = os.environ.get('FACE_YUNET_MODEL', os.path.join(MODELS_DIR, 'face_detection_yunet_2023mar.onnx'))
+DNN_PROTO = os.environ.get('FACE_DNN_PROTO', os.path.join(MODELS_DIR, 'deploy.prototxt'))
+DNN_MODEL = os.environ.get('FACE_DNN_MODEL', os.path.join(MODELS_DIR, 'res10_300x300_ssd_iter_140000.caffemodel'))
+
+DETECTOR_KINDS = ('hog', 'cnn', 'haar', 'yunet', 'dnn', 'mediapipe')
+
+
+def _to_boxes(rects, shape):
+    """(x, y, w, h) rects -> clipped (top, right, bottom, left) boxes, largest first."""
+    h, w = shape[:2]
+    boxes = []
+    for x, y, bw, bh in rects:
+        top, left = max(0, int(y)), max(0, int(x))
+        bottom, right = min(h, int(y + bh)), min(w, int(x + bw))
+        if bottom > top and right > left:
+            boxes.append((top, right, bottom, left))
+    boxes.sort(key=lambda b: (b[2] - b[0]) * (b[1] - b[3]), reverse=True)
+    return boxes
+
+
+class HOGDetector:
+    name = 'hog'
+
+    def __init__(self, upsample=1, model='hog'):
+        self.upsample = upsample
+        self.model = model
+        self.name = model
+
+    def detect(self, rgb):
+        locs = face_recognition.face_locations(rgb, number_of_times_to_upsample=self.upsample, model=self.model)
+        return _to_boxes(((l, t, r - l, b - t) for t, r, b, l in locs), rgb.shape)
+
+
+class HaarDetector:
+    name = 'haar'
+
+    def __init__(self, min_size=20):
+        path = os.path.join(cv2.data.haarcascades, 'haarcascade_frontalface_default.xml')
+        self.cascade = cv2.CascadeClassifier(path)
+        if self.cascade.empty():
+            raise RuntimeError(f"Could not load Haar cascade {path}")
+        self.min_size = (min_size, min_size)
+
+    def detect(self, rgb):
+        gray = cv2.cvtColor(rgb, cv2.COLOR_RGB2GRAY)
+        rects = self.cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5, minSize=self.min_size)
+        return _to_boxes(rects, rgb.shape)
+
+
+class YuNetDetector:
+    name = 'yunet'
+
+    def __init__(self, model_path=YUNET_MODEL, min_score=DETECTOR_MIN_SCORE):
+        if not hasattr(cv2, 'FaceDetectorYN'):
+            raise RuntimeError("OpenCV build has no FaceDetectorYN (needs opencv >= 4.5.4)")
+        if not os.path.exists(model_path):
+            raise RuntimeError(f"YuNet model not found at {model_path}")
+        self.detector = cv2.FaceDetectorYN.create(model_path, "", (320, 320), min_score)
+        self.input_size = None
+
+    def detect(self, rgb):
+        h, w = rgb.shape[:2]
+        if self.input_size != (w, h):
+            self.detector.setInputSize((w, h))
+            self.input_size = (w, h)
+        _, faces = self.detector.detect(cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR))
+        if faces is None:
+            return []
+        return _to_boxes((f[:4] for f in faces), rgb.shape)
+
+
+class DNNDetector:
+    name = 'dnn'
+
+    def __init__(self, proto_path=DNN_PROTO, model_path=DNN_MODEL, min_score=DETECTOR_MIN_SCORE):
+        for path in (proto_path, model_path):
+            if not os.path.exists(path):
+                raise RuntimeError(f"OpenCV DNN face model not found at {path}")
+        self.net = cv2.dnn.readNetFromCaffe(proto_path, model_path)
+        self.min_score = min_score
+
+    @staticmethod
+    def blob(bgr):
+        """The res10 SSD was trained on BGR 300x300 input with these (B, G, R) means."""
+        return cv2.dnn.blobFromImage(cv2.resize(bgr, (300, 300)), 1.0, (300, 300), (104.0, 177.0, 123.0), swapRB=False)
+
+    def detect(self, rgb):
+        h, w = rgb.shape[:2]
+        self.net.setInput(self.blob(cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR)))
+        out = self.net.forward()[0, 0]
+        rects = []
+        for det in out[out[:, 2] >= self.min_score]:
+            x1, y1, x2, y2 = det[3] * w, det[4] * h, det[5] * w, det[6] * h
+            rects.append((x1, y1, x2 - x1, y2 - y1))
+        return _to_boxes(rects, rgb.shape)
+
+
+class MediaPipeDetector:
+    name = 'mediapipe'
+
+    def __init__(self, min_score=DETECTOR_MIN_SCORE, full_range=True):
+        if not HAS_MEDIAPIPE:
+            raise RuntimeError("mediapipe is not installed")
+        # model_selection=1 is the full-range model (faces up to ~5 m, i.e. the back of a classroom)
+        self.detector = mp.solutions.face_detection.FaceDetection(
+            model_selection=1 if full_range else 0,
+            min_detection_confidence=min_score,
+        )
+
+    def detect(self, rgb):
+        results = self.detector.process(rgb)
+        if not results.detections:
+            return []
+        h, w = rgb.shape[:2]
+        rects = []
+        for det in results.detections:
+            box = det.location_data.relative_bounding_box
+            rects.append((box.xmin * w, box.ymin * h, box.width * w, box.height * h))
+        return _to_boxes(rects, rgb.shape)
+
+
+_BACKENDS = {
+    'hog': HOGDetector,
+    'cnn': lambda: HOGDetector(model='cnn'),
+    'haar': HaarDetector,
+    'yunet': YuNetDetector,
+    'dnn': DNNDetector,
+    'mediapipe': MediaPipeDetector,
+}
+
+
+def make_detector(kind=DETECTOR_KIND):
+    """
+    Builds the requested detector backend.
+    Falls back to dlib HOG (with a warning) if the backend can't be created.
+    """
+    kind = (kind or 'auto').lower()
+    candidates = ['mediapipe', 'yunet', 'hog'] if kind == 'auto' else [kind]
+    if kind != 'auto' and kind not in _BACKENDS:
+        print(f"⚠️ Unknown FACE_DETECTOR '{kind}', using hog")
+        candidates = ['hog']
+
+    for name in candidates:
+        try:
+            return _BACKENDS[name]()
+        except Exception as e:
+            if kind != 'auto':
+                print(f"⚠️ Face detector '{name}' unavailable ({e}), using hog")
+    return HOGDetector()
+
+
+if __name__ == '__main__':
+    # Sanity check on a sample photo: python face_detector.py [image] [backend ...]
+    import sys
+    import time
+    import numpy as np
+
+    if len(sys.argv) > 1:
+        path = sys.argv[1]
+    else:
+        faces_dir = os.path.join(BASE_DIR, 'images', 'faces')
+        path = os.path.join(faces_dir, sorted(f for f in os.listdir(faces_dir) if f.lower().endswith(('.png', '.jpg', '.jpeg')))[0])
+    bgr = cv2.imread(path)
+    if bgr is None:
+        sys.exit(f"Could not read {path}")
+
+    # The DNN blob must hold the BGR channels minus the BGR means, whatever order the caller's frame is in
+    blob = DNNDetector.blob(bgr)[0]
+    expected = cv2.resize(bgr, (300, 300)).astype(np.float32) - np.float32([104.0, 177.0, 123.0])
+    assert np.allclose(blob.transpose(1, 2, 0), expected), "DNN blob is not BGR minus the BGR means"
+    print("dnn blob: BGR input, BGR means ✓")
+
+    rgb = cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB)
+    for kind in sys.argv[2:] or DETECTOR_KINDS:
+        try:
+            detector = _BACKENDS[kind]()
+        except Exception as e:
+            print(f"{kind:<10} unavailable ({e})")
+            continue
+        start = time.perf_counter()
+        boxes = detector.detect(rgb)
+        print(f"{kind:<10} {len(boxes)} face(s) in {(time.perf_counter() - start) * 1000:.0f} ms: {boxes}")
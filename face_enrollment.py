@@ -0,0 +1,274 @@
+"""
+Incremental face enrollment for OMNIS.
+
+Builds the encoding store from images/faces, but only runs the HOG detector
+and ResNet encoder on images that were added or changed since the last
+build. Each image's SHA-1, mtime and size are recorded in the store's
+sources.json next to the row its encoding lives in:
+
+- same mtime + size        -> reuse the stored row (no hashing, no decode)
+- different mtime, same hash -> reuse the stored row (file was only touched)
+- new or different hash    -> re-encode
+- file gone                -> drop its row
+
+Rows that no image accounts for (e.g. people registered by voice through
+register_face.py) are kept unless a photo with the same ID is (re)encoded.
+
+Images that need encoding are fanned out over a process pool (one worker
+per available core by default, ENROLL_WORKERS to override) and oversized
+photos are downscaled to ENROLL_MAX_DIM on their longest side first.
+Results are checkpointed into the store every ENROLL_CHECKPOINT images, so
+an interrupted build resumes where it stopped; the final write puts the
+rows in filename order.
+"""
+import argparse
+import hashlib
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import cv2
+import face_recognition
+import numpy as np
+
+from encoding_store import EncodingStore, load_encodings
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+FACES_DIR = os.path.join(BASE_DIR, 'images', 'faces')
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+
+# Longest side (px) photos are shrunk to before detection; HOG cost grows with pixel count
+ENROLL_MAX_DIM = int(os.environ.get('ENROLL_MAX_DIM', '800'))
+
+
+def available_cores():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+ENROLL_WORKERS = int(os.environ.get('ENROLL_WORKERS', '0')) or available_cores()
+# Encoded images written to the store per checkpoint while a build runs
+ENROLL_CHECKPOINT = int(os.environ.get('ENROLL_CHECKPOINT', '16'))
+
+
+def file_sha1(path):
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def encode_image(path, max_dim=ENROLL_MAX_DIM):
+    """Returns the first face encoding found in the image at `path`, or None."""
+    img = cv2.imread(path)
+    if img is None:
+        return None
+    h, w = img.shape[:2]
+    if max_dim and max(h, w) > max_dim:
+        scale = max_dim / max(h, w)
+        img = cv2.resize(img, (0, 0), None, scale, scale, interpolation=cv2.INTER_AREA)
+    img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+    encodings = face_recognition.face_encodings(img)
+    return encodings[0] if encodings else None
+
+
+def _encode_job(encode_fn, path):
+    # Runs inside a worker process; errors are returned, not raised, so one bad photo can't sink the batch
+    try:
+        return path, encode_fn(path), None
+    except Exception as e:
+        return path, None, str(e)
+
+
+def encode_images(paths, encode_fn=encode_image, workers=ENROLL_WORKERS):
+    """
+    Encodes `paths`, in parallel when workers > 1.
+    Yields (path, encoding_or_None, error_or_None) in completion order, printing progress as results arrive.
+    """
+    total = len(paths)
+    if total == 0:
+        return
+    workers = max(1, min(workers, total))
+    start = time.time()
+
+    def progress(done, path, encoding, error):
+        status = "✅" if encoding is not None else ("❌" if error else "⚠️")
+        detail = f" ({error})" if error else ""
+        print(f"  [{done}/{total}] {status} {os.path.basename(path)}{detail}")
+
+    if workers == 1:
+        for done, path in enumerate(paths, 1):
+            path, encoding, error = _encode_job(encode_fn, path)
+            progress(done, path, encoding, error)
+            yield path, encoding, error
+    else:
+        print(f"Encoding {total} images on {workers} worker processes...")
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_encode_job, encode_fn, p) for p in paths]
+            for done, future in enumerate(as_completed(futures), 1):
+                path, encoding, error = future.result()
+                progress(done, path, encoding, error)
+                yield path, encoding, error
+
+    elapsed = time.time() - start
+    print(f"Encoded {total} images in {elapsed:.1f}s ({total / max(elapsed, 1e-6):.1f} img/s)")
+
+
+def list_face_images(faces_dir=FACES_DIR):
+    if not os.path.isdir(faces_dir):
+        return []
+    return sorted(f for f in os.listdir(faces_dir) if f.lower().endswith(IMAGE_EXTENSIONS))
+
+
+def incremental_build(faces_dir=FACES_DIR, store=None, encode_fn=encode_image, force=False,
+                      workers=ENROLL_WORKERS):
+    """
+    Brings the encoding store in line with `faces_dir`, encoding only what changed.
+    force: ignore recorded hashes and re-encode every image (rows of deleted images are still dropped)
+    workers: encoder processes (1 = encode in this process)
+    Returns: report dict with 'added', 'changed', 'removed', 'no_face', 'failed' file lists
+             and 'unchanged' / 'kept' / 'total' counts
+    """
+    store = store or EncodingStore()
+    try:
+        matrix, ids = load_encodings(store.path)
+        # Copy out of the memmap: store.write() replaces matrix.f32, which Windows refuses while it is mapped
+        matrix = np.array(matrix)
+        sources = store.read_sources()
+    except Exception as e:
+        print(f"⚠️ Encoding store unreadable ({e}). Re-encoding every image.")
+        matrix, ids, sources = np.zeros((0, 128), dtype=np.float32), [], {}
+
+    def row_of(entry):
+        row = entry.get('row', -1)
+        if row == -1 or (0 <= row < len(ids) and ids[row] == entry.get('id')):
+            return row
+        return None  # stale entry: store was rewritten by something else
+
+    report = {'added': [], 'changed': [], 'removed': [], 'no_face': [], 'failed': [], 'unchanged': 0, 'kept': 0}
+    new_rows, new_ids, new_sources = [], [], {}
+    covered_ids = set()
+    to_encode = {}  # path -> (filename, person_id, sha1, stat)
+
+    for filename in list_face_images(faces_dir):
+        path = os.path.join(faces_dir, filename)
+        st = os.stat(path)
+        person_id = os.path.splitext(filename)[0]
+        covered_ids.add(person_id)
+
+        entry = None if force else sources.get(filename)
+        old_row = row_of(entry) if entry else None
+        digest = None
+
+        if old_row is not None:
+            reuse = entry.get('mtime_ns') == st.st_mtime_ns and entry.get('size') == st.st_size
+            if not reuse:
+                digest = file_sha1(path)
+                reuse = digest == entry.get('sha1')
+            if reuse:
+                row = -1
+                if old_row >= 0:
+                    new_rows.append(matrix[old_row])
+                    new_ids.append(person_id)
+                    row = len(new_ids) - 1
+                new_sources[filename] = dict(entry, mtime_ns=st.st_mtime_ns, size=st.st_size, row=row)
+                report['unchanged'] += 1
+                continue
+
+        to_encode[path] = (filename, person_id, digest or file_sha1(path), st)
+
+    # Keep rows no image file owns (voice registrations, legacy entries)
+    owned_rows = {row_of(e) for e in sources.values()}
+    kept_rows, kept_ids = [], []
+    for row, person_id in enumerate(ids):
+        if row not in owned_rows and person_id not in covered_ids:
+            kept_rows.append(matrix[row])
+            kept_ids.append(person_id)
+    report['kept'] = len(kept_ids)
+
+    # Results are checkpointed into the store in batches as workers finish, so an
+    # interrupted build keeps what it encoded and the next run carries on from there
+    encoded = []
+    if to_encode:
+        store.write(np.asarray(new_rows + kept_rows, dtype=np.float32).reshape(-1, 128), new_ids + kept_ids)
+        checkpoint = dict(new_sources)
+        store.write_sources(checkpoint)
+        count, batch = len(new_ids) + len(kept_ids), []
+
+        def flush():
+            nonlocal count
+            faces = [(entry['id'], encoding) for _, entry, encoding in batch if encoding is not None]
+            if faces:
+                store.extend([encoding for _, encoding in faces], [person_id for person_id, _ in faces])
+            for filename, entry, encoding in batch:
+                row = -1
+                if encoding is not None:
+                    row = count
+                    count += 1
+                checkpoint[filename] = dict(entry, row=row)
+            store.write_sources(checkpoint)
+            batch.clear()
+
+        for path, encoding, error in encode_images(list(to_encode), encode_fn, workers):
+            filename, person_id, digest, st = to_encode[path]
+            if error:
+                # Not recorded in sources, so the next build retries it
+                report['failed'].append(filename)
+                continue
+            entry = {'id': person_id, 'sha1': digest, 'mtime_ns': st.st_mtime_ns, 'size': st.st_size}
+            encoded.append((filename, entry, encoding))
+            batch.append((filename, entry, encoding))
+            if len(batch) >= ENROLL_CHECKPOINT:
+                flush()
+        if batch:
+            flush()
+
+    # Final layout in filename order, so rebuilds of the same photos are deterministic
+    for filename, entry, encoding in sorted(encoded, key=lambda e: e[0]):
+        report['changed' if filename in sources else 'added'].append(filename)
+        row = -1
+        if encoding is None:
+            report['no_face'].append(filename)
+        else:
+            new_rows.append(np.asarray(encoding, dtype=np.float32))
+            new_ids.append(entry['id'])
+            row = len(new_ids) - 1
+        new_sources[filename] = dict(entry, row=row)
+
+    report['failed'].sort()
+    report['removed'] = sorted(f for f in sources if f not in new_sources and f not in report['failed'])
+
+    new_rows += kept_rows
+    new_ids += kept_ids
+    report['total'] = len(new_ids)
+    store_changed = bool(to_encode) or report['removed'] or new_ids != list(ids)
+    if store_changed:
+        store.write(np.asarray(new_rows, dtype=np.float32).reshape(-1, 128), new_ids)
+    if store_changed or new_sources != sources:
+        store.write_sources(new_sources)
+    return report
+
+
+def enrollment_args(description):
+    """Command line of the enrollment scripts (EncodeGenerator.py, regenerate_encodings.py)."""
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('--full', action='store_true', help="ignore recorded hashes and re-encode every image")
+    parser.add_argument('--workers', type=int, default=ENROLL_WORKERS,
+                        help=f"encoder processes (default: {ENROLL_WORKERS})")
+    return parser.parse_args()
+
+
+def print_report(report):
+    for label, key in (("➕ Added", 'added'), ("🔄 Changed", 'changed'), ("➖ Removed", 'removed')):
+        for filename in report[key]:
+            print(f"  {label}: {filename}")
+    for filename in report['no_face']:
+        print(f"  ⚠️ No face found: {filename}")
+    for filename in report['failed']:
+        print(f"  ❌ Failed (will retry next run): {filename}")
+    print(f"Encodings: {report['total']} total | {len(report['added'])} added, "
+          f"{len(report['changed'])} changed, {len(report['removed'])} removed, "
+          f"{report['unchanged']} unchanged")
@@ -0,0 +1,81 @@
+"""
+Vectorized face gallery for OMNIS.
+
+Holds every known face encoding in one contiguous float32 (N, 128) matrix
+so a whole frame's worth of detected faces can be matched with a single
+matrix multiply instead of one `compare_faces` + `face_distance` call per face.
+Lookups go through a pluggable index (see face_index.py): exact for small
+rosters, IVF partitioned search for large ones.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+import metrics
+from face_index import make_index, INDEX_KIND
+
+ENCODING_DIM = 128
+UNKNOWN_ID = "Unknown"
+
+# person_id: matched ID (or "Unknown"), index: row in the gallery (-1 if none)
+# distance: euclidean distance to the best row, margin: runner-up distance - best distance
+FaceMatch = namedtuple("FaceMatch", ["person_id", "index", "distance", "margin"])
+
+
+class FaceGallery:
+    def __init__(self, encodings=None, ids=None, tolerance=0.5, index_kind=INDEX_KIND, index_path=None):
+        self.tolerance = tolerance
+        self.ids = list(ids) if ids is not None else []
+
+        if encodings is None or len(encodings) == 0:
+            matrix = np.zeros((0, ENCODING_DIM), dtype=np.float32)
+        else:
+            matrix = np.asarray(encodings, dtype=np.float32).reshape(-1, ENCODING_DIM)
+
+        if len(self.ids) != matrix.shape[0]:
+            raise ValueError(f"FaceGallery: {matrix.shape[0]} encodings but {len(self.ids)} ids")
+
+        self.matrix = np.ascontiguousarray(matrix)
+        # Precomputed squared norms: |a - b|^2 = |a|^2 + |b|^2 - 2 a.b
+        self.sq_norms = np.einsum('ij,ij->i', self.matrix, self.matrix)
+        self.index = make_index(self.matrix, self.sq_norms, kind=index_kind, index_path=index_path)
+
+    def __len__(self):
+        return self.matrix.shape[0]
+
+    def distances(self, face_encodings):
+        """
+        Euclidean distances between every query face and every gallery row.
+        Returns: (M, N) float32 array
+        """
+        queries = np.asarray(face_encodings, dtype=np.float32).reshape(-1, ENCODING_DIM)
+        q_norms = np.einsum('ij,ij->i', queries, queries)
+        sq = q_norms[:, None] + self.sq_norms[None, :] - 2.0 * (queries @ self.matrix.T)
+        np.maximum(sq, 0.0, out=sq)
+        return np.sqrt(sq, out=sq)
+
+    @metrics.timed('vision.match')
+    def match(self, face_encodings):
+        """
+        Matches a batch of detected face encodings against the gallery.
+        Returns: list of FaceMatch, one per input encoding (same order)
+        """
+        if face_encodings is None or len(face_encodings) == 0:
+            return []
+
+        if len(self) == 0:
+            return [FaceMatch(UNKNOWN_ID, -1, float('inf'), 0.0) for _ in range(len(face_encodings))]
+
+        queries = np.asarray(face_encodings, dtype=np.float32).reshape(-1, ENCODING_DIM)
+        dist, idx = self.index.search(queries, k=2)
+        best_dist, runner_up = dist[:, 0], dist[:, 1]
+        best_idx = idx[:, 0]
+
+        results = []
+        for i in range(len(queries)):
+            row = int(best_idx[i])
+            d = float(best_dist[i])
+            margin = float(runner_up[i] - best_dist[i])
+            person_id = self.ids[row] if row >= 0 and d <= self.tolerance else UNKNOWN_ID
+            results.append(FaceMatch(person_id, row, d, margin))
+        return results
@@ -0,0 +1,219 @@
+"""
+Nearest-neighbour indexes behind FaceGallery.
+
+- BruteForceIndex: exact scan over every known encoding (best for small galleries)
+- IVFIndex: k-means partitioned "inverted file" index, pure NumPy. Only the
+  `n_probe` closest partitions are scanned per query, so lookup cost stays
+  roughly flat as the roster grows. Larger `n_probe` = better recall, slower.
+
+Selection (env vars):
+    FACE_INDEX          auto | exact | ivf   (default: auto)
+    FACE_INDEX_MIN_SIZE gallery size at which 'auto' switches to IVF (default: 5000)
+    FACE_INDEX_NPROBE   partitions scanned per query (default: 8)
+
+The IVF partitions are saved to INDEX_PATH, keyed by a fingerprint of the
+gallery; whenever the gallery changed (enrollment, voice registration) the
+index is rebuilt once and saved again.
+"""
+import hashlib
+import os
+
+import numpy as np
+
+INDEX_KIND = os.environ.get('FACE_INDEX', 'auto').lower()
+IVF_MIN_SIZE = int(os.environ.get('FACE_INDEX_MIN_SIZE', '5000'))
+IVF_NPROBE = int(os.environ.get('FACE_INDEX_NPROBE', '8'))
+KMEANS_ITERATIONS = 12
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+INDEX_PATH = os.path.join(BASE_DIR, 'images', 'face_index.npz')
+
+
+def matrix_fingerprint(matrix):
+    """Short content hash used to detect a saved index that no longer matches the gallery."""
+    return hashlib.sha1(np.ascontiguousarray(matrix, dtype=np.float32).tobytes()).hexdigest()
+
+
+def _sq_norms(x):
+    return np.einsum('ij,ij->i', x, x)
+
+
+def _pairwise_sq(queries, q_norms, rows, row_norms):
+    sq = q_norms[:, None] + row_norms[None, :] - 2.0 * (queries @ rows.T)
+    np.maximum(sq, 0.0, out=sq)
+    return sq
+
+
+def _top_k(sq, k):
+    """Returns (sq distances, column indices) of the k smallest per row, sorted ascending."""
+    m, n = sq.shape
+    out_d = np.full((m, k), np.inf, dtype=np.float32)
+    out_i = np.full((m, k), -1, dtype=np.int64)
+    if n == 0:
+        return out_d, out_i
+    kk = min(k, n)
+    if n > kk:
+        part = np.argpartition(sq, kk - 1, axis=1)[:, :kk]
+    else:
+        part = np.tile(np.arange(n), (m, 1))
+    part_d = np.take_along_axis(sq, part, axis=1)
+    order = np.argsort(part_d, axis=1)
+    out_i[:, :kk] = np.take_along_axis(part, order, axis=1)
+    out_d[:, :kk] = np.take_along_axis(part_d, order, axis=1)
+    return out_d, out_i
+
+
+class BruteForceIndex:
+    kind = "exact"
+
+    def __init__(self, matrix, sq_norms=None):
+        self.matrix = matrix
+        self.sq_norms = _sq_norms(matrix) if sq_norms is None else sq_norms
+
+    def search(self, queries, k=2):
+        """
+        Returns: (distances, indices), both (M, k). Missing neighbours are inf / -1.
+        """
+        sq = _pairwise_sq(queries, _sq_norms(queries), self.matrix, self.sq_norms)
+        d, idx = _top_k(sq, k)
+        return np.sqrt(d), idx
+
+
+class IVFIndex:
+    kind = "ivf"
+
+    def __init__(self, matrix, sq_norms=None, n_lists=None, n_probe=IVF_NPROBE, seed=0):
+        self.matrix = matrix
+        self.sq_norms = _sq_norms(matrix) if sq_norms is None else sq_norms
+        self.n_probe = n_probe
+        self.seed = seed
+        n = matrix.shape[0]
+        self.n_lists = n_lists or max(1, int(np.sqrt(n)))
+        self.centroids = None
+        self.order = None     # gallery rows grouped by partition
+        self.offsets = None   # partition p occupies order[offsets[p]:offsets[p + 1]]
+        self.packed = None    # matrix rows in `order`, so each partition is a contiguous view
+        self.packed_norms = None
+        self.fingerprint = None
+
+    def build(self):
+        n = self.matrix.shape[0]
+        n_lists = min(self.n_lists, max(1, n))
+        rng = np.random.default_rng(self.seed)
+
+        if n == 0:
+            centroids = np.zeros((1, self.matrix.shape[1]), dtype=np.float32)
+            assign = np.zeros(0, dtype=np.int64)
+        else:
+            centroids = self.matrix[rng.choice(n, n_lists, replace=False)].copy()
+            for _ in range(KMEANS_ITERATIONS):
+                sq = _pairwise_sq(self.matrix, self.sq_norms, centroids, _sq_norms(centroids))
+                assign = np.argmin(sq, axis=1)
+                counts = np.bincount(assign, minlength=n_lists)
+                sums = np.zeros_like(centroids)
+                np.add.at(sums, assign, self.matrix)
+                filled = counts > 0
+                centroids[filled] = sums[filled] / counts[filled, None]
+                # Re-seed empty partitions from random rows so no list is wasted
+                empty = np.flatnonzero(~filled)
+                if len(empty):
+                    centroids[empty] = self.matrix[rng.choice(n, len(empty), replace=False)]
+            sq = _pairwise_sq(self.matrix, self.sq_norms, centroids, _sq_norms(centroids))
+            assign = np.argmin(sq, axis=1)
+
+        self.n_lists = centroids.shape[0]
+        self.centroids = centroids.astype(np.float32)
+        self.order = np.argsort(assign, kind='stable')
+        counts = np.bincount(assign, minlength=self.n_lists)
+        self.offsets = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+        self.fingerprint = matrix_fingerprint(self.matrix)
+        self._pack()
+        return self
+
+    def _pack(self):
+        self.packed = np.ascontiguousarray(self.matrix[self.order])
+        self.packed_norms = self.sq_norms[self.order]
+
+    def search(self, queries, k=2):
+        """
+        Returns: (distances, indices), both (M, k). Missing neighbours are inf / -1.
+        """
+        if self.centroids is None:
+            self.build()
+
+        q_norms = _sq_norms(queries)
+        c_sq = _pairwise_sq(queries, q_norms, self.centroids, _sq_norms(self.centroids))
+        n_probe = min(self.n_probe, self.n_lists)
+        probes = np.argpartition(c_sq, n_probe - 1, axis=1)[:, :n_probe]
+
+        # Scan the union of probed partitions in one matmul, then mask out
+        # partitions each individual query did not probe
+        probe_mask = np.zeros((len(queries), self.n_lists), dtype=bool)
+        np.put_along_axis(probe_mask, probes, True, axis=1)
+        lists = np.flatnonzero(probe_mask.any(axis=0))
+        starts = self.offsets[lists]
+        lens = self.offsets[lists + 1] - starts
+        total = int(lens.sum())
+        if total == 0:
+            return (np.full((len(queries), k), np.inf, dtype=np.float32),
+                    np.full((len(queries), k), -1, dtype=np.int64))
+
+        # Packed positions of every candidate row, built without a Python loop
+        pos = np.arange(total) + np.repeat(starts - (np.cumsum(lens) - lens), lens)
+        sq = _pairwise_sq(queries, q_norms, self.packed[pos], self.packed_norms[pos])
+        sq[~probe_mask[:, np.repeat(lists, lens)]] = np.inf
+
+        out_d, local = _top_k(sq, k)
+        out_i = np.where(local >= 0, self.order[pos[local]], -1)
+        out_i[~np.isfinite(out_d)] = -1
+        return np.sqrt(out_d), out_i
+
+    def save(self, path):
+        tmp = path + '.tmp'
+        with open(tmp, 'wb') as f:
+            np.savez(f, centroids=self.centroids, order=self.order, offsets=self.offsets,
+                     fingerprint=np.array(self.fingerprint))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path, matrix, sq_norms=None, n_probe=IVF_NPROBE):
+        """Loads a saved index. Returns None if the file is missing or stale for `matrix`."""
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path) as data:
+                if str(data['fingerprint']) != matrix_fingerprint(matrix):
+                    return None
+                index = cls(matrix, sq_norms, n_lists=len(data['centroids']), n_probe=n_probe)
+                index.centroids = data['centroids']
+                index.order = data['order']
+                index.offsets = data['offsets']
+                index.fingerprint = str(data['fingerprint'])
+            index._pack()
+            return index
+        except Exception as e:
+            print(f"⚠️ Could not load face index ({e}). Rebuilding...")
+            return None
+
+
+def make_index(matrix, sq_norms=None, kind=INDEX_KIND, index_path=None):
+    """
+    Picks and prepares an index for `matrix`.
+    kind: 'exact', 'ivf' or 'auto' (IVF once the gallery reaches IVF_MIN_SIZE rows)
+    index_path: where the IVF index is loaded from; a rebuilt one is saved back there
+    """
+    if kind == 'auto':
+        kind = 'ivf' if matrix.shape[0] >= IVF_MIN_SIZE else 'exact'
+
+    if kind == 'ivf':
+        index = IVFIndex.load(index_path, matrix, sq_norms) if index_path else None
+        if index is None:
+            index = IVFIndex(matrix, sq_norms).build()
+            if index_path:
+                try:
+                    index.save(index_path)
+                except OSError as e:
+                    print(f"⚠️ Could not save face index ({e})")
+        return index
+
+    return BruteForceIndex(matrix, sq_norms)
@@ -0,0 +1,154 @@
+"""
+Lightweight face tracker for OMNIS.
+
+Between (expensive) HOG detections, face boxes are carried from frame to
+frame with sparse Lucas-Kanade optical flow on the small grayscale frame,
+so boxes follow the person and keep their identity. Detections are matched
+back to existing tracks by IoU; only detections that start a new track need
+the 128-d encoder.
+
+Boxes use face_recognition's (top, right, bottom, left) order throughout.
+"""
+import os
+import time
+
+import cv2
+import numpy as np
+
+TRACK_MAX_MISSES = int(os.environ.get('TRACK_MAX_MISSES', '2'))
+TRACK_IOU_THRESHOLD = 0.3
+MIN_TRACK_POINTS = 4
+
+_LK_PARAMS = dict(winSize=(9, 9), maxLevel=2,
+                  criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 10, 0.03))
+
+
+def box_iou(a, b):
+    top, right = max(a[0], b[0]), min(a[1], b[1])
+    bottom, left = min(a[2], b[2]), max(a[3], b[3])
+    inter = max(0, right - left) * max(0, bottom - top)
+    area_a = (a[1] - a[3]) * (a[2] - a[0])
+    area_b = (b[1] - b[3]) * (b[2] - b[0])
+    union = area_a + area_b - inter
+    return inter / union if union > 0 else 0.0
+
+
+class Track:
+    def __init__(self, track_id, box):
+        self.track_id = track_id
+        self.box = np.array(box, dtype=np.float32)
+        self.person_id = "Unknown"
+        self.match = None
+        self.misses = 0
+        # IoU between the flow-predicted box and the detection it was last matched to (None = new track)
+        self.match_iou = None
+        self.created = time.time()
+
+    def location(self):
+        top, right, bottom, left = self.box
+        return int(round(top)), int(round(right)), int(round(bottom)), int(round(left))
+
+
+class FaceTracker:
+    def __init__(self, max_misses=TRACK_MAX_MISSES, iou_threshold=TRACK_IOU_THRESHOLD):
+        self.max_misses = max_misses
+        self.iou_threshold = iou_threshold
+        self.tracks = []
+        self.prev_gray = None
+        self.next_id = 1
+
+    def update(self, gray):
+        """
+        Moves every track from the previous frame to `gray` with optical flow.
+        Returns: True if any track was lost (caller should re-detect)
+        """
+        prev, self.prev_gray = self.prev_gray, gray
+        if prev is None or not self.tracks or prev.shape != gray.shape:
+            return False
+
+        h, w = gray.shape[:2]
+        lost = False
+        kept = []
+        for track in self.tracks:
+            # If flow fails the track stays put (identity kept) until the next detection re-matches it
+            kept.append(track)
+            top, right, bottom, left = track.location()
+            top, left = max(0, top), max(0, left)
+            bottom, right = min(h, bottom), min(w, right)
+            if bottom - top < 4 or right - left < 4:
+                lost = True
+                continue
+
+            mask = np.zeros_like(prev)
+            mask[top:bottom, left:right] = 255
+            pts = cv2.goodFeaturesToTrack(prev, maxCorners=30, qualityLevel=0.01, minDistance=2, mask=mask)
+            if pts is None or len(pts) < MIN_TRACK_POINTS:
+                lost = True
+                continue
+
+            new_pts, status, _ = cv2.calcOpticalFlowPyrLK(prev, gray, pts, None, **_LK_PARAMS)
+            good = status.reshape(-1) == 1
+            if good.sum() < MIN_TRACK_POINTS:
+                lost = True
+                continue
+
+            old_p, new_p = pts.reshape(-1, 2)[good], new_pts.reshape(-1, 2)[good]
+            dx, dy = np.median(new_p - old_p, axis=0)
+
+            # Scale from the change in spread around the median point
+            old_spread = np.median(np.linalg.norm(old_p - np.median(old_p, axis=0), axis=1))
+            new_spread = np.median(np.linalg.norm(new_p - np.median(new_p, axis=0), axis=1))
+            scale = float(np.clip(new_spread / old_spread, 0.8, 1.25)) if old_spread > 1e-3 else 1.0
+
+            t, r, b, l = track.box
+            cy, cx = (t + b) / 2 + dy, (l + r) / 2 + dx
+            half_h, half_w = (b - t) / 2 * scale, (r - l) / 2 * scale
+            track.box = np.array([cy - half_h, cx + half_w, cy + half_h, cx - half_w], dtype=np.float32)
+
+            # Track drifted out of the frame
+            if cx < 0 or cx >= w or cy < 0 or cy >= h:
+                kept.pop()
+                lost = True
+
+        self.tracks = kept
+        return lost
+
+    def reconcile(self, detections):
+        """
+        Matches fresh detections to tracks (greedy, highest IoU first).
+        Matched tracks snap to the detected box and keep their identity;
+        unmatched tracks age out after `max_misses` detections.
+        Returns: list of newly created tracks
+        """
+        pairs = sorted(
+            ((box_iou(t.box, d), ti, di) for ti, t in enumerate(self.tracks) for di, d in enumerate(detections)),
+            reverse=True,
+        )
+        used_t, used_d = set(), set()
+        for iou, ti, di in pairs:
+            if iou < self.iou_threshold:
+                break
+            if ti in used_t or di in used_d:
+                continue
+            used_t.add(ti)
+            used_d.add(di)
+            self.tracks[ti].box = np.array(detections[di], dtype=np.float32)
+            self.tracks[ti].misses = 0
+            self.tracks[ti].match_iou = iou
+
+        kept = []
+        for ti, track in enumerate(self.tracks):
+            if ti not in used_t:
+                track.misses += 1
+                if track.misses > self.max_misses:
+                    continue
+            kept.append(track)
+
+        new_tracks = []
+        for di, det in enumerate(detections):
+            if di not in used_d:
+                track = Track(self.next_id, det)
+                self.next_id += 1
+                new_tracks.append(track)
+        self.tracks = kept + new_tracks
+        return new_tracks
@@ -0,0 +1,73 @@
+"""
+Layered frame composer for the OMNIS window.
+
+Each displayed frame is built from layers instead of being drawn into one
+long-lived background image:
+
+    1. background  the static background.png (never drawn on)
+    2. mode panel  one of Resources/Modes, loaded and sized once
+    3. camera      the live camera frame
+    4. overlays    face boxes, names, portrait, status, subtitles: drawn by the
+                   caller onto the buffer compose() returns
+
+compose() resets a single preallocated output buffer from the background
+layer every frame, so overlays from earlier frames can't ghost and nothing
+is allocated per frame.
+"""
+import os
+
+import cv2
+import numpy as np
+
+CAMERA_POS = (55, 162)    # (x, y) of the 640x480 camera feed
+CAMERA_SIZE = (640, 480)
+MODE_POS = (808, 44)      # (x, y) of the mode panel
+MODE_SIZE = (414, 633)
+
+_mode_cache = {}
+
+
+def load_mode_images(folder_path, size=MODE_SIZE):
+    """Reads every mode panel in `folder_path` once (sorted by file name) and returns the cached list."""
+    folder_path = os.path.abspath(folder_path)
+    if folder_path not in _mode_cache:
+        images = []
+        if os.path.isdir(folder_path):
+            for path in sorted(os.listdir(folder_path)):
+                img = cv2.imread(os.path.join(folder_path, path))
+                if img is None:
+                    continue
+                if (img.shape[1], img.shape[0]) != size:
+                    img = cv2.resize(img, size, interpolation=cv2.INTER_AREA)
+                images.append(img)
+        _mode_cache[folder_path] = images
+    return _mode_cache[folder_path]
+
+
+class FrameComposer:
+    def __init__(self, background, mode_images=(), output_size=(1280, 720)):
+        if background is None:
+            background = np.zeros((output_size[1], output_size[0], 3), np.uint8)
+        self.background = background.copy()
+        self.background.flags.writeable = False
+        self.mode_images = list(mode_images)
+        self.output = np.empty_like(self.background)
+
+    def _paste(self, img, pos, size):
+        x, y = pos
+        w, h = size
+        if img.shape[:2] != (h, w):
+            img = cv2.resize(img, (w, h))
+        self.output[y:y + h, x:x + w] = img
+
+    def compose(self, camera_frame=None, mode_type=None):
+        """
+        Builds background + mode panel + camera into the output buffer.
+        Returns: the output buffer; draw overlays on it, then display it. It is overwritten by the next compose().
+        """
+        np.copyto(self.output, self.background)
+        if mode_type is not None and 0 <= mode_type < len(self.mode_images):
+            self._paste(self.mode_images[mode_type], MODE_POS, MODE_SIZE)
+        if camera_frame is not None:
+            self._paste(camera_frame, CAMERA_POS, CAMERA_SIZE)
+        return self.output
@@ -0,0 +1,178 @@
+"""
+Shared-memory camera frame ring for OMNIS.
+
+One capture process owns the camera and writes every frame into a fixed
+ring of slots in a `multiprocessing.shared_memory` block. Any number of
+reader processes (recognition, gesture, emotion, UI) attach to the block by
+name and read the newest frame as a NumPy view, with no pickling or copies.
+
+Layout of the block:
+
+    int64[1 + slots]     head sequence number, then the sequence held by each slot
+    float64[slots]       capture timestamp of each slot
+    uint8[slots, H, W, C] frame data
+
+Each slot is guarded like a seqlock: the writer marks the slot -1 while
+copying a frame in and publishes the new sequence number afterwards, so a
+reader can tell whether the slot it is looking at was overwritten in the
+meantime (`is_current`). A view returned by `latest()` stays intact until
+the writer laps the ring, i.e. for `slots - 1` more frames.
+"""
+import multiprocessing as mp
+import os
+import time
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+CAMERA_INDEX = int(os.environ.get('CAMERA_INDEX', '0'))
+RING_SLOTS = int(os.environ.get('FRAME_RING_SLOTS', '4'))
+
+
+class FrameRing:
+    def __init__(self, shm, shape, slots, owner=False):
+        self.shm = shm
+        self.shape = tuple(shape)
+        self.slots = slots
+        self.owner = owner
+
+        meta_bytes = 8 * (1 + slots)
+        times_bytes = 8 * slots
+        self._meta = np.ndarray((1 + slots,), dtype=np.int64, buffer=shm.buf, offset=0)
+        self._times = np.ndarray((slots,), dtype=np.float64, buffer=shm.buf, offset=meta_bytes)
+        self.frames = np.ndarray((slots,) + self.shape, dtype=np.uint8, buffer=shm.buf,
+                                 offset=meta_bytes + times_bytes)
+
+    @staticmethod
+    def _size(shape, slots):
+        return 8 * (1 + slots) + 8 * slots + slots * int(np.prod(shape))
+
+    @classmethod
+    def create(cls, shape=(480, 640, 3), slots=RING_SLOTS, name=None):
+        shm = shared_memory.SharedMemory(name=name, create=True, size=cls._size(shape, slots))
+        ring = cls(shm, shape, slots, owner=True)
+        ring._meta[:] = 0
+        return ring
+
+    @classmethod
+    def attach(cls, name, shape, slots):
+        return cls(shared_memory.SharedMemory(name=name), shape, slots)
+
+    def spec(self):
+        """Picklable description a child process can `attach(**spec)` with."""
+        return {'name': self.shm.name, 'shape': self.shape, 'slots': self.slots}
+
+    @property
+    def head(self):
+        return int(self._meta[0])
+
+    def write(self, frame, frame_time=None):
+        """Publishes `frame` (must match the ring's shape). Returns its sequence number."""
+        seq = self.head + 1
+        idx = seq % self.slots
+        self._meta[1 + idx] = -1  # readers skip the slot while it is being filled
+        self.frames[idx][...] = frame
+        self._times[idx] = frame_time or time.time()
+        self._meta[1 + idx] = seq
+        self._meta[0] = seq
+        return seq
+
+    def is_current(self, seq):
+        """True while the slot that held `seq` has not been overwritten."""
+        return seq > 0 and int(self._meta[1 + seq % self.slots]) == seq
+
+    def latest(self, copy=False):
+        """
+        Newest complete frame.
+        Returns: (seq, frame_time, frame) or None if nothing was written yet.
+                 `frame` is a view into shared memory unless copy=True.
+        """
+        for _ in range(self.slots):
+            seq = self.head
+            if seq == 0:
+                return None
+            idx = seq % self.slots
+            if int(self._meta[1 + idx]) != seq:
+                continue  # lapped between reading head and slot; try again
+            frame_time = float(self._times[idx])
+            frame = self.frames[idx].copy() if copy else self.frames[idx]
+            if self.is_current(seq):
+                return seq, frame_time, frame
+        return None
+
+    def wait_newer(self, last_seq, timeout=0.5, copy=False, poll=0.002):
+        """Waits until a frame newer than `last_seq` is available. Returns latest() or None on timeout."""
+        deadline = time.time() + timeout
+        while self.head <= last_seq:
+            if time.time() >= deadline:
+                return None
+            time.sleep(poll)
+        return self.latest(copy=copy)
+
+    def close(self):
+        # Views must go before the buffer can be released
+        self._meta = self._times = self.frames = None
+        try:
+            self.shm.close()
+        except BufferError:
+            pass  # a caller still holds a frame view; the mapping goes when it does
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+class CaptureProcess(mp.Process):
+    """Owns the camera and feeds a FrameRing, so decoding runs on its own core."""
+
+    def __init__(self, ring_spec, device=CAMERA_INDEX):
+        mp.Process.__init__(self, daemon=True)
+        self.ring_spec = ring_spec
+        self.device = device
+        self.stop_event = mp.Event()
+
+    def run(self):
+        ring = FrameRing.attach(**self.ring_spec)
+        height, width = ring.shape[:2]
+        cap = cv2.VideoCapture(self.device)
+        cap.set(3, width)
+        cap.set(4, height)
+        failures = 0
+        try:
+            while not self.stop_event.is_set():
+                success, frame = cap.read()
+                if not success or frame is None:
+                    failures += 1
+                    if failures % 30 == 0:
+                        print("⚠️ Capture: camera not reading, reopening...")
+                        cap.release()
+                        cap = cv2.VideoCapture(self.device)
+                        cap.set(3, width)
+                        cap.set(4, height)
+                    time.sleep(0.05)
+                    continue
+                failures = 0
+                if frame.shape != ring.shape:
+                    frame = cv2.resize(frame, (width, height))
+                ring.write(frame)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            cap.release()
+            ring.close()
+
+    def stop(self, timeout=2.0):
+        self.stop_event.set()
+        self.join(timeout)
+        if self.is_alive():
+            self.terminate()
+
+
+def start_capture(device=CAMERA_INDEX, width=640, height=480, slots=RING_SLOTS):
+    """Creates a ring for `width` x `height` BGR frames and starts the capture process. Returns (ring, process)."""
+    ring = FrameRing.create((height, width, 3), slots)
+    process = CaptureProcess(ring.spec(), device)
+    process.start()
+    return ring, process
@@ -1,3 +1,6 @@
+import os
+import time
+
 import cv2
 import numpy as np
 try:
@@ -7,6 +10,15 @@ except ImportError:
     HAS_MEDIAPIPE = False
     print("⚠️ Warning: mediapipe not found. Gesture recognition will be disabled.")
 
+# A gesture has to be seen on this many consecutive model runs before it fires
+GESTURE_CONFIRM_FRAMES = int(os.environ.get('GESTURE_CONFIRM_FRAMES', '3'))
+GESTURE_COOLDOWN = float(os.environ.get('GESTURE_COOLDOWN', '2.0'))  # seconds before the same gesture can fire again
+# Motion gate: share of the 80x60 preview that must change (and look like skin) before Hands runs
+GATE_SIZE = (80, 60)
+GATE_MIN_MOTION = 0.01
+GATE_MIN_SKIN_MOTION = 0.002
+HAND_HOLD = 1.0  # keep running Hands this long after a hand was last seen, even if it holds still
+
 class GestureManager:
     def __init__(self):
         self.enabled = HAS_MEDIAPIPE
@@ -23,6 +35,7 @@ class GestureManager:
         # Gesture states
         self.current_gesture = None
         self.last_gesture_time = 0
+        self.hand_present = False
 
     def detect_gesture(self, frame):
         """
@@ -34,6 +47,7 @@ class GestureManager:
             
         results = self.hands.process(frame)
         gesture = None
+        self.hand_present = bool(results.multi_hand_landmarks)
 
         if results.multi_hand_landmarks:
             for hand_landmarks in results.multi_hand_landmarks:
@@ -73,10 +87,98 @@ class GestureManager:
         other_tips = [8, 12, 16, 20]
         return thumb_tip.y > thumb_ip.y and all(thumb_tip.y > landmarks.landmark[ot].y for ot in other_tips)
 
+class MotionGate:
+    """Cheap check on a tiny preview: did anything skin-coloured move since the last frame?"""
+
+    def __init__(self, size=GATE_SIZE, min_motion=GATE_MIN_MOTION, min_skin_motion=GATE_MIN_SKIN_MOTION):
+        self.size = size
+        self.min_motion = min_motion
+        self.min_skin_motion = min_skin_motion
+        self.prev = None
+
+    def check(self, rgb):
+        small = cv2.resize(rgb, self.size, interpolation=cv2.INTER_AREA)
+        gray = cv2.GaussianBlur(cv2.cvtColor(small, cv2.COLOR_RGB2GRAY), (5, 5), 0)
+        prev, self.prev = self.prev, gray
+        if prev is None:
+            return True
+
+        moving = cv2.absdiff(gray, prev) > 25
+        if moving.mean() < self.min_motion:
+            return False
+        # Typical skin range in YCrCb; only counts where something also moved
+        ycrcb = cv2.cvtColor(small, cv2.COLOR_RGB2YCrCb)
+        skin = cv2.inRange(ycrcb, (0, 133, 77), (255, 173, 127)) > 0
+        return (moving & skin).mean() >= self.min_skin_motion
+
+
+class GestureEngine:
+    """
+    Debounced gestures on top of GestureManager.
+    - MotionGate skips MediaPipe Hands while nothing moves (unless a hand was just seen)
+    - a gesture must persist for `confirm_frames` model runs before it is reported
+    - each gesture is reported once, then not again until the hand changes pose
+      and `cooldown` seconds have passed
+    Same interface as GestureManager.detect_gesture, but returns a gesture only
+    on the call where it fires (None otherwise).
+    """
+
+    def __init__(self, manager=None, confirm_frames=GESTURE_CONFIRM_FRAMES, cooldown=GESTURE_COOLDOWN):
+        self.manager = manager or GestureManager()
+        self.enabled = self.manager.enabled
+        self.gate = MotionGate()
+        self.confirm_frames = confirm_frames
+        self.cooldown = cooldown
+        self.candidate, self.streak = None, 0
+        self.latched = None  # gesture that fired and hasn't been released yet
+        self.last_fired = {}
+        self.last_hand_time = 0.0
+        self.calls = 0
+        self.model_runs = 0
+        self.fired = 0
+
+    def detect_gesture(self, frame):
+        if not self.enabled:
+            return None
+        self.calls += 1
+        now = time.time()
+
+        moving = self.gate.check(frame)
+        if not moving and now - self.last_hand_time > HAND_HOLD:
+            raw = None
+        else:
+            self.model_runs += 1
+            raw = self.manager.detect_gesture(frame)
+            if self.manager.hand_present:
+                self.last_hand_time = now
+        return self._vote(raw, now)
+
+    def _vote(self, raw, now):
+        if raw == self.candidate:
+            self.streak += 1
+        else:
+            self.candidate, self.streak = raw, 1
+        if raw != self.latched:
+            self.latched = None
+
+        if raw is None or self.streak < self.confirm_frames or raw == self.latched:
+            return None
+        if now - self.last_fired.get(raw, 0.0) < self.cooldown:
+            return None
+        self.latched = raw
+        self.last_fired[raw] = now
+        self.fired += 1
+        return raw
+
+    def stats(self):
+        return {'calls': self.calls, 'model_runs': self.model_runs,
+                'gated': self.calls - self.model_runs, 'fired': self.fired}
+
+
 if __name__ == "__main__":
     # Test with camera
     cap = cv2.VideoCapture(0)
-    gm = GestureManager()
+    gm = GestureEngine()
     while True:
         ret, frame = cap.read()
         if not ret: break
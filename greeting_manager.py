@@ -106,27 +106,29 @@ class GreetingManager:
         # Condition: Seen relatively recently (between 1 min and 1 hour)
         return self._get_casual_greeting(name)
 
-    def _get_casual_greeting(self, name):
-        """Generate a varied casual greeting."""
+    def _short_name(self, name):
         # Priority 1: Explicit nickname
         if name in self.nicknames:
-            short_name = self.nicknames[name]
+            return self.nicknames[name]
         # Priority 2: First part of a multi-word name (e.g. "Deva Nandan" -> "Deva")
         elif " " in name:
-            short_name = name.split()[0]
+            return name.split()[0]
         # Priority 3: Full name
         else:
-            short_name = name
-        
-        options = [
+            return name
+
+    def _casual_options(self, short_name):
+        return [
             f"Hi again {short_name}!",
             f"Welcome back {short_name}.",
             f"Good to see you {short_name}.",
             f"How is it going {short_name}?",
             f"Hello there {short_name}!"
-            
         ]
-        return random.choice(options)
+
+    def _get_casual_greeting(self, name):
+        """Generate a varied casual greeting."""
+        return random.choice(self._casual_options(self._short_name(name)))
 
     def get_unknown_greeting(self):
         """Greeting for unknown people."""
@@ -134,3 +136,19 @@ class GreetingManager:
         self.last_greeted["Unknown"] = now
         tg = self._get_time_of_day_greeting()
         return f"{tg}! Welcome to MGM Model School."
+
+    def static_greetings(self, names=()):
+        """
+        Every greeting that doesn't depend on memory: VIP intros, the unknown-visitor greeting and,
+        for each name in `names`, the formal and casual greetings. For pre-rendering speech.
+        """
+        times = ["Good morning", "Good afternoon", "Good evening", "Ooh, staying up late? Good evening", "Hello"]
+        phrases = list(self.special_intros.values())
+        phrases += [f"{tg}! Welcome to MGM Model School." for tg in times]
+        for name in names:
+            if name == "Unknown":
+                continue
+            if name not in self.special_intros:
+                phrases += [f"{tg} {name}! Welcome to MGM Model School." for tg in times]
+            phrases += self._casual_options(self._short_name(name))
+        return list(dict.fromkeys(phrases))
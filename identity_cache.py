@@ -0,0 +1,119 @@
+"""
+Per-track identity cache for OMNIS.
+
+Once a tracked face has been encoded and matched, its ID is remembered
+against the track instead of being recomputed on every detection pass.
+A cached identity is re-verified (re-encoded and re-matched) only when:
+
+- it is older than IDENTITY_REVERIFY_SECONDS (sooner for "Unknown" faces,
+  which often resolve once the person turns towards the camera), or
+- the detected box jumped away from where the tracker expected it
+  (IoU below IDENTITY_JUMP_IOU), which usually means a different person.
+
+A known identity is only downgraded to "Unknown" after
+IDENTITY_UNKNOWN_STREAK failed re-verifications in a row, so a head turn
+doesn't flicker the name off.
+"""
+import os
+import time
+
+from face_gallery import UNKNOWN_ID
+
+IDENTITY_REVERIFY_SECONDS = float(os.environ.get('IDENTITY_REVERIFY_SECONDS', '10.0'))
+IDENTITY_UNKNOWN_REVERIFY_SECONDS = float(os.environ.get('IDENTITY_UNKNOWN_REVERIFY_SECONDS', '2.0'))
+IDENTITY_JUMP_IOU = 0.5
+IDENTITY_UNKNOWN_STREAK = 2
+
+
+def match_confidence(match, tolerance):
+    """0..1 score from a FaceMatch: 1 at distance 0, 0 at (or past) the tolerance."""
+    if match is None or match.person_id == UNKNOWN_ID or tolerance <= 0:
+        return 0.0
+    return max(0.0, min(1.0, 1.0 - match.distance / tolerance))
+
+
+class CachedIdentity:
+    def __init__(self, person_id, match, confidence, verified_at):
+        self.person_id = person_id
+        self.match = match
+        self.confidence = confidence
+        self.verified_at = verified_at
+        self.unknown_streak = 0
+
+
+class IdentityCache:
+    def __init__(self, reverify_seconds=IDENTITY_REVERIFY_SECONDS,
+                 unknown_reverify_seconds=IDENTITY_UNKNOWN_REVERIFY_SECONDS, jump_iou=IDENTITY_JUMP_IOU):
+        self.reverify_seconds = reverify_seconds
+        self.unknown_reverify_seconds = unknown_reverify_seconds
+        self.jump_iou = jump_iou
+        self.entries = {}  # track_id -> CachedIdentity
+        self.hits = 0
+        self.misses = 0
+        self.reverifications = 0
+        self.identity_changes = 0
+
+    def get(self, track_id):
+        return self.entries.get(track_id)
+
+    def needs_encoding(self, track, now=None):
+        """
+        True if `track` has to go through the encoder this detection pass.
+        Counts a hit when the cached identity can be reused as-is.
+        """
+        now = now or time.time()
+        entry = self.entries.get(track.track_id)
+        if entry is None:
+            self.misses += 1
+            return True
+
+        max_age = self.unknown_reverify_seconds if entry.person_id == UNKNOWN_ID else self.reverify_seconds
+        jumped = track.match_iou is not None and track.match_iou < self.jump_iou
+        if jumped or now - entry.verified_at >= max_age:
+            self.misses += 1
+            self.reverifications += 1
+            return True
+
+        self.hits += 1
+        return False
+
+    def update(self, track_id, match, tolerance, now=None):
+        """Records a fresh match for `track_id`. Returns the identity to use for the track."""
+        now = now or time.time()
+        confidence = match_confidence(match, tolerance)
+        entry = self.entries.get(track_id)
+        if entry is None:
+            entry = self.entries[track_id] = CachedIdentity(match.person_id, match, confidence, now)
+            return entry
+
+        entry.verified_at = now
+        if match.person_id == UNKNOWN_ID and entry.person_id != UNKNOWN_ID:
+            entry.unknown_streak += 1
+            if entry.unknown_streak < IDENTITY_UNKNOWN_STREAK:
+                return entry  # probably a bad angle; keep the known name for now
+
+        if match.person_id != entry.person_id:
+            self.identity_changes += 1
+        entry.person_id, entry.match, entry.confidence = match.person_id, match, confidence
+        entry.unknown_streak = 0
+        return entry
+
+    def prune(self, active_track_ids):
+        """Forgets identities of tracks that no longer exist."""
+        active = set(active_track_ids)
+        for track_id in [t for t in self.entries if t not in active]:
+            del self.entries[track_id]
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hit_rate(),
+            'reverifications': self.reverifications,
+            'identity_changes': self.identity_changes,
+            'cached': len(self.entries),
+        }
@@ -1,28 +1,35 @@
 import os
-import pickle
 import cv2
 import numpy as np
 import cvzone
-import face_recognition
 import time
-from speaker import speak, is_speaking
+from speaker import speak, is_speaking, tts_registry
 from sr_class import SpeechRecognitionThread
 import shared_state
 from greeting_manager import GreetingManager
 from head_controller import init_head
-from gesture_manager import GestureManager
-from gesture_manager import GestureManager
-from emotion_manager import EmotionManager
+from gesture_manager import GestureEngine
+from emotion_manager import EmotionManager, MoodSmoother, mood_key
 from ui_manager import UIManager
+from face_gallery import FaceGallery
+from face_index import INDEX_PATH
+from encoding_store import load_encodings
+from face_enrollment import incremental_build, print_report
+from vision_worker import VisionWorker
+from frame_ring import start_capture
+from perception import PerceptionSupervisor
+from portrait_cache import PortraitCache
+from frame_composer import FrameComposer, load_mode_images
+from display import Display
+import metrics
+import voice_trace
 import shared_state
 
 # Adapter for SR thread
 class SpeakerAdapter:
-    def speak(self, text):
-        speak(text)
+    def speak(self, text, trace=None, filler=False, cache=True, epoch=None):
+        return speak(text, trace, filler, cache, epoch)
     def stop(self):
-        # Implementation to stop current playback if possible
-        # For now, we can just signal the speaker module
         from speaker import stop_speech
         stop_speech()
 
@@ -36,8 +43,12 @@ IMAGES_DIR = os.path.join(BASE_DIR, 'images')
 # Global Configuration
 FACE_MATCH_TOLERANCE = float(os.environ.get('FACE_MATCH_TOLERANCE', '0.50'))
 MAX_FACES = int(os.environ.get('FACE_MAX_FACES', '4'))
-FRAME_SKIP = 5 
 RESIZE_FACTOR = 0.20 
+UPSCALE = int(round(1 / RESIZE_FACTOR))
+# Capture in its own process, publishing frames through shared memory (0 = read the camera in this loop)
+SHARED_CAPTURE = os.environ.get('SHARED_CAPTURE', '1') != '0'
+# Gesture + mood models in their own processes (0 = run them on the vision thread)
+PERCEPTION_PROCESSES = os.environ.get('PERCEPTION_PROCESSES', '1') != '0'
 
 # Initialize Greeter
 greeter = GreetingManager()
@@ -46,11 +57,7 @@ greeter = GreetingManager()
 print("Loading Resources...")
 try:
     imgBackground = cv2.imread(os.path.join(RESOURCES_DIR, 'background.png'))
-    folderModePath = os.path.join(RESOURCES_DIR, 'Modes')
-    if os.path.exists(folderModePath):
-        imgModeList = [cv2.imread(os.path.join(folderModePath, p)) for p in sorted(os.listdir(folderModePath))]
-    else:
-        imgModeList = []
+    imgModeList = load_mode_images(os.path.join(RESOURCES_DIR, 'Modes'))
 except Exception as e:
     print(f"Warning: Could not load background/modes: {e}")
     imgBackground = np.zeros((720, 1280, 3), np.uint8) 
@@ -61,41 +68,23 @@ except Exception as e:
 # Load Encodings
 print("Loading Encoded File...")
 encode_list_known, studentIds = [], []
-encoding_path = os.path.join(IMAGES_DIR, 'encoded_file.p')
 
 try:
-    with open(encoding_path, 'rb') as f:
-        encode_list_known_with_ids = pickle.load(f)
-    encode_list_known, studentIds = encode_list_known_with_ids
+    encode_list_known, studentIds = load_encodings()
+    if not studentIds:
+        raise FileNotFoundError("encoding store is empty")
     print(f"Loaded {len(studentIds)} people.")
 except Exception as e:
     print(f"⚠️ Error loading encodings ({e}). Attempting to regenerate...")
     try:
-        # Fallback: Regenerate encodings
+        # Fallback: Rebuild the store, encoding only images it doesn't already cover
         faces_dir = os.path.join(IMAGES_DIR, 'faces')
         if os.path.exists(faces_dir):
-            path_list = os.listdir(faces_dir)
-            temp_ids = []
-            temp_encodings = []
+            report = incremental_build(faces_dir)
+            print_report(report)
+            encode_list_known, studentIds = load_encodings()
             
-            for path in path_list:
-                if path.lower().endswith(('.png', '.jpg', '.jpeg')):
-                    img_path = os.path.join(faces_dir, path)
-                    img = cv2.imread(img_path)
-                    if img is not None:
-                        img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-                        encs = face_recognition.face_encodings(img)
-                        if encs:
-                            temp_encodings.append(encs[0])
-                            temp_ids.append(os.path.splitext(path)[0])
-                            print(f"  - Re-encoded: {path}")
-            
-            encode_list_known = temp_encodings
-            studentIds = temp_ids
-            
-            if encode_list_known:
-                with open(encoding_path, 'wb') as f:
-                    pickle.dump([encode_list_known, studentIds], f)
+            if studentIds:
                 print(f"✅ Successfully regenerated {len(studentIds)} encodings.")
             else:
                 print("⚠️ No valid faces found.")
@@ -106,6 +95,10 @@ except Exception as e:
         print(f"❌ Critical failure regenerating: {regen_error}")
         encode_list_known, studentIds = [], []
 
+# Pack all known encodings into one matrix for batched matching
+gallery = FaceGallery(encode_list_known, studentIds, tolerance=FACE_MATCH_TOLERANCE,
+                      index_path=INDEX_PATH)
+
 # Reset shared state
 try:
     shared_state.awaiting_name = False
@@ -114,9 +107,18 @@ except:
 
 def main():
     global imgBackground
-    cap = cv2.VideoCapture(0)
-    cap.set(3, 640)
-    cap.set(4, 480)
+    metrics_log = metrics.init_metrics()
+    ring, capture, cap = None, None, None
+    last_frame_seq = 0
+    if SHARED_CAPTURE:
+        try:
+            ring, capture = start_capture(width=640, height=480)
+        except Exception as e:
+            print(f"⚠️ Shared capture unavailable ({e}). Reading the camera directly.")
+    if ring is None:
+        cap = cv2.VideoCapture(0)
+        cap.set(3, 640)
+        cap.set(4, 480)
     
     mode_type = 0
     speech_thread = None
@@ -125,6 +127,9 @@ def main():
     frame_count = 0
     current_faces = []      # Last detected face locations
     current_ids = []        # Last detected face IDs
+    current_track_ids = []  # Tracker ID per face (keys unknown faces' moods)
+    mood_smoother = MoodSmoother()
+    last_mood_seq = -1
     
     # Start Voice Listener Immediately (Always-on Assistant)
     print("Starting Voice Assistant...")
@@ -139,11 +144,27 @@ def main():
     head = init_head()
 
     # Initialize Recognition Managers
-    gesture_man = GestureManager()
-    emotion_man = EmotionManager()
+    perception, gesture_man, emotion_man = None, None, None
+    if PERCEPTION_PROCESSES:
+        try:
+            perception = PerceptionSupervisor(ring.spec() if ring else None).start()
+        except Exception as e:
+            print(f"⚠️ Perception workers unavailable ({e}). Running gesture/mood on the vision thread.")
+    if perception is None:
+        gesture_man = GestureEngine()
+        emotion_man = EmotionManager()
+
+    # Recognition runs on its own thread; this loop only renders
+    vision = VisionWorker(gallery, gesture_man, emotion_man, resize_factor=RESIZE_FACTOR, max_faces=MAX_FACES)
+    vision.start()
+    last_vision_seq = -1
 
     # Initialize UI Manager
     ui = UIManager()
+    composer = FrameComposer(imgBackground, imgModeList)
+    portraits = PortraitCache(os.path.join(IMAGES_DIR, 'faces'), os.path.join(RESOURCES_DIR, 'avatar.png'))
+    display = Display("Face Attendance")
+    timer = display.timer
     
     # State tracking for UI
     last_user_text = ""
@@ -153,7 +174,18 @@ def main():
     
     try:
         while True:
-            success, img = cap.read()
+            timer.start()
+            frame_time = None  # capture time; only the ring knows it
+            if ring is not None:
+                # Own copy: the render loop draws on it and the vision worker holds on to it
+                item = ring.wait_newer(last_frame_seq, timeout=0.5, copy=True)
+                success = item is not None
+                img = None
+                if success:
+                    last_frame_seq, frame_time, img = item
+                    metrics.record('capture.age', (time.time() - frame_time) * 1000)
+            else:
+                success, img = cap.read()
             if not success or img is None:
                 if frame_count % 30 == 0:
                     print("⚠️ Warning: Camera not reading. Check connection.")
@@ -162,78 +194,77 @@ def main():
                 success = True
             
             frame_count += 1
+            gesture, mood = None, None
+            timer.mark('cam')
             
-            # --- VISION PIPELINE (Optimized) ---
-            # Only run heavy Face Recognition every N frames
-            if frame_count % FRAME_SKIP == 0:
-                imgS = cv2.resize(img, (0, 0), None, RESIZE_FACTOR, RESIZE_FACTOR)
-                imgS = cv2.cvtColor(imgS, cv2.COLOR_BGR2RGB)
+            # --- VISION PIPELINE (Background Worker) ---
+            # Hand the freshest frame to the worker; never wait for it
+            vision.submit(img, frame_time)
+            result = vision.latest()
+            
+            if result is not None and result.seq != last_vision_seq:
+                last_vision_seq = result.seq
+                current_faces = result.faces
+                current_ids = result.ids
+                current_track_ids = result.track_ids
                 
-                try:
-                    face_locs = face_recognition.face_locations(imgS)
-                    # Limit faces to prevent lag
-                    if len(face_locs) > MAX_FACES:
-                        face_locs = face_locs[:MAX_FACES]
-                        
-                    if face_locs:
-                        face_encs = face_recognition.face_encodings(imgS, face_locs)
-                        
-                        new_ids = []
-                        for encodeFace in face_encs:
-                            matches = face_recognition.compare_faces(encode_list_known, encodeFace, tolerance=FACE_MATCH_TOLERANCE)
-                            face_dist = face_recognition.face_distance(encode_list_known, encodeFace)
-                            
-                            match_index = np.argmin(face_dist) if len(face_dist) > 0 else -1
-                            
-                            if match_index != -1 and matches[match_index]:
-                                new_ids.append(studentIds[match_index])
-                            else:
-                                new_ids.append("Unknown")
-                        
-                        current_faces = face_locs
-                        current_ids = new_ids
-                        
-                        # --- ACTIVE FACE TRACKING ---
-                        # Track the largest face (usually the one closest/primary)
-                        # face_locs is in (top, right, bottom, left) format
-                        if current_faces:
-                            top, right, bottom, left = current_faces[0]
-                            cx = (left + right) // 2
-                            cy = (top + bottom) // 2
-                            # Calculate small frame dimensions
-                            sh, sw, _ = imgS.shape
-                            head.track_face(cx, cy, frame_w=sw, frame_h=sh)
-                            # Sync speaking state for head gestures
-                            head.set_speaking(is_speaking())
-                        
-                        # Update shared state for Voice Commands ("Who is here?")
-                        shared_state.detected_people = current_ids
-                        # Primary user (first face) for memory context
-                        shared_state.active_user = current_ids[0] if current_ids else "Unknown"
-                    else:
-                        current_faces = []
-                        current_ids = []
-                        shared_state.detected_people = []
-                        shared_state.active_user = "Unknown"
-                        
-                except Exception as e:
-                    print(f"Face Rec Error: {e}")
+                if current_faces:
+                    # --- ACTIVE FACE TRACKING ---
+                    # Track the largest face (usually the one closest/primary)
+                    # face_locs is in (top, right, bottom, left) format
+                    top, right, bottom, left = current_faces[0]
+                    cx = (left + right) // 2
+                    cy = (top + bottom) // 2
+                    # Calculate small frame dimensions
+                    sh, sw = result.frame_shape
+                    if head:
+                        head.track_face(cx, cy, frame_w=sw, frame_h=sh)
+                        # Sync speaking state for head gestures
+                        head.set_speaking(is_speaking())
+                
+                # Update shared state for Voice Commands ("Who is here?")
+                shared_state.detected_people = current_ids
+                # Primary user (first face) for memory context
+                shared_state.active_user = current_ids[0] if current_ids else "Unknown"
+                if perception is None:
+                    gesture, mood = result.gesture, result.mood
+
+            timer.mark('vision')
+
+            # --- PERCEPTION (Gesture + Mood workers) ---
+            if perception is not None:
+                # Mood only looks at the faces we already found (boxes scaled to the full frame)
+                mood_faces = [(mood_key(pid, tid), tuple(v * UPSCALE for v in box))
+                              for box, pid, tid in zip(current_faces, current_ids, current_track_ids)]
+                perception.submit(img, last_frame_seq if ring else frame_count, frame_time, faces=mood_faces)
+                perception.poll()
+                # Every gesture that fired since the last poll; a STOP wins over anything after it
+                fired = [r.value for r in perception.take_events('gesture')]
+                if fired:
+                    gesture = "STOP" if "STOP" in fired else fired[-1]
+                mood_result = perception.latest('emotion')
+                if mood_result and mood_result.seq != last_mood_seq:
+                    last_mood_seq = mood_result.seq
+                    mood = mood_result.value
 
             # --- GESTURE PIPELINE ---
-            if frame_count % 3 == 0: # Check gestures more frequently than faces
-                rgb_img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-                gesture = gesture_man.detect_gesture(rgb_img)
-                if gesture == "STOP" and is_speaking():
-                    print("✋ Gesture STOP detected!")
-                    from speaker import stop_speech
-                    stop_speech()
-                elif gesture == "THUMBS_UP" and not is_speaking():
-                    # Optional: Quick interaction
-                    pass
-                
-                # --- EMOTION (Mood) PIPELINE ---
-                mood = emotion_man.detect_emotion(rgb_img)
-                shared_state.active_user_mood = mood
+            # Gestures arrive debounced: each one is reported once, after it has been held for a few frames
+            if gesture == "STOP" and is_speaking():
+                print("✋ Gesture STOP detected!")
+                from speaker import stop_speech
+                stop_speech()
+            elif gesture == "THUMBS_UP" and not is_speaking():
+                # Optional: Quick interaction
+                pass
+
+            # --- EMOTION (Mood) PIPELINE ---
+            if mood is not None:
+                mood_smoother.update(mood)
+                shared_state.user_moods = mood_smoother.snapshot()
+                # The active user is the primary (first) face
+                if current_ids:
+                    primary = mood_key(current_ids[0], current_track_ids[0])
+                    shared_state.active_user_mood = mood_smoother.mood(primary)
 
             # --- HEAD TRACKING ---
             if head:
@@ -246,60 +277,12 @@ def main():
                     # Note: We pass resized coordinates (relative to RESIZE_FACTOR frame)
                     head.track_face(cx, cy)
             
-            # --- DRAWING PIPELINE ---
-            try:
-                # Paste webcam feed
-                imgBackground[162:162+480, 55:55+640] = img
-                if imgModeList:
-                    imgBackground[44:44+633, 808:808+414] = imgModeList[mode_type]
-            except Exception as e:
-                print(f"❌ UI Draw Error: {e}")
-            
-            detected_person_for_greeting = None
-            
-            if current_faces:
-                # We have faces (either fresh or cached from previous frame)
-                for i, (y1, x2, y2, x1) in enumerate(current_faces):
-                    # Scale back up (1 / 0.20 = 5)
-                    y1, x2, y2, x1 = y1*5, x2*5, y2*5, x1*5
-                    person_id = current_ids[i]
-                    
-                    if person_id != "Unknown":
-                        # Known Face
-                        mode_type = 1
-                        bbox = (55+x1, 162+y1, x2 - x1, y2 - y1)
-                        # Replaced with UIManager: imgBackground = cvzone.cornerRect(imgBackground, bbox=bbox, rt=0)
-                        ui.draw_face_box(imgBackground, bbox, person_id, is_known=True)
-                        
-                        # Find the largest/main face to greet
-                        detected_person_for_greeting = person_id
-                        
-                        # UI: Name
-                        (w, h), _ = cv2.getTextSize(person_id, cv2.FONT_HERSHEY_COMPLEX, 1, 1)
-                        offset = (414 - w) / 2
-                        cv2.putText(imgBackground, str(person_id), (808 + int(offset), 445), cv2.FONT_HERSHEY_COMPLEX, 1, (50, 50, 50), 1)
-                        
-                        # UI: Image
-                        img_path = os.path.join(IMAGES_DIR, 'faces', f'{person_id}.jpg')
-                        if os.path.exists(img_path):
-                            student_img = cv2.imread(img_path)
-                            if student_img is not None:
-                                try:
-                                    student_img = cv2.resize(student_img, (216, 216))
-                                    imgBackground[175:175 + 216, 909:909 + 216] = student_img
-                                except: pass
-                    
-                    else:
-                        # Unknown Face
-                        mode_type = 0
-                        # Replaced with UIManager
-                        bbox = (55+x1, 162+y1, x2 - x1, y2 - y1)
-                        ui.draw_face_box(imgBackground, bbox, "Unknown", is_known=False)
-                        # cv2.rectangle(imgBackground, (55+x1, 162+y1), (55+x2, 162+y2), (0, 0, 255), 2)
-                        
-            else:
-                mode_type = 0
-
+            # --- SCENE STATE (needed whether or not this frame is drawn) ---
+            # Greet the last known face; the mode panel follows the last face
+            known_ids = [pid for pid in current_ids if pid != "Unknown"]
+            detected_person_for_greeting = known_ids[-1] if known_ids else None
+            mode_type = 1 if current_ids and current_ids[-1] != "Unknown" else 0
+            timer.mark('perc')
 
             # --- GREETING PIPELINE ---
             is_listening = speech_thread.is_listening if speech_thread else False
@@ -312,7 +295,8 @@ def main():
                     greeting_text = greeter.get_greeting(detected_person_for_greeting)
                     if greeting_text:
                         print(f"Greeting: {greeting_text}")
-                        speak(greeting_text)
+                        # Greetings with a memory follow-up are one-off: keep them out of the phrase cache
+                        speak(greeting_text, cache=greeting_text in greeter.static_greetings([detected_person_for_greeting]))
                         
                         # Update interaction time to block immediate re-greetings
                         shared_state.last_interaction_time = time.time()
@@ -346,33 +330,91 @@ def main():
             elif speech_thread and speech_thread.is_listening: 
                 # Note: We need to expose 'is_listening' in sr_class or infer it
                 current_status = "LISTENING"
+            timer.mark('logic')
+
+            display.publish({'status': current_status, 'people': list(current_ids),
+                             'active_user': shared_state.active_user, 'mood': shared_state.active_user_mood})
+
+            # Full rate while someone is here or OMNIS is talking; a few FPS otherwise; never when headless
+            active = bool(current_faces) or current_status != "IDLE" or time.time() < ui.subtitle_timer
+            if not display.should_render(active):
+                continue
+
+            # --- DRAWING PIPELINE ---
+            # Fresh background + mode panel + webcam feed; overlays go on top
+            canvas = composer.compose(img, mode_type)
+            
+            # We have faces (either fresh or cached from previous frame)
+            for i, (y1, x2, y2, x1) in enumerate(current_faces):
+                # Scale back up (1 / 0.20 = 5)
+                y1, x2, y2, x1 = y1*UPSCALE, x2*UPSCALE, y2*UPSCALE, x1*UPSCALE
+                person_id = current_ids[i]
+                bbox = (55+x1, 162+y1, x2 - x1, y2 - y1)
+                
+                if person_id != "Unknown":
+                    # Known Face
+                    # Replaced with UIManager: imgBackground = cvzone.cornerRect(imgBackground, bbox=bbox, rt=0)
+                    ui.draw_face_box(canvas, bbox, person_id, is_known=True)
+                    
+                    # UI: Name
+                    (w, h), _ = cv2.getTextSize(person_id, cv2.FONT_HERSHEY_COMPLEX, 1, 1)
+                    offset = (414 - w) / 2
+                    cv2.putText(canvas, str(person_id), (808 + int(offset), 445), cv2.FONT_HERSHEY_COMPLEX, 1, (50, 50, 50), 1)
+                    
+                    # UI: Image (decoded + resized once, then cached)
+                    canvas[175:175 + 216, 909:909 + 216] = portraits.get(person_id)
+                
+                else:
+                    # Unknown Face
+                    ui.draw_face_box(canvas, bbox, "Unknown", is_known=False)
+                    # cv2.rectangle(imgBackground, (55+x1, 162+y1), (55+x2, 162+y2), (0, 0, 255), 2)
             
             # Check for new text in shared_state (requires update in sr_class/ai_response to write to shared_state)
+            new_user_text, new_ai_text = None, None
             if hasattr(shared_state, 'last_user_text') and shared_state.last_user_text != last_user_text:
-                last_user_text = shared_state.last_user_text
-                ui.draw_subtitles(imgBackground, user_text=last_user_text)
+                last_user_text = new_user_text = shared_state.last_user_text
                 
             if hasattr(shared_state, 'last_ai_text') and shared_state.last_ai_text != last_ai_text:
-                last_ai_text = shared_state.last_ai_text
-                ui.draw_subtitles(imgBackground, ai_text=last_ai_text)
+                last_ai_text = new_ai_text = shared_state.last_ai_text
                 
             # Draw persistent elements
-            ui.draw_status_bar(imgBackground, current_status)
-            # Redraw active subtitle if timer is valid
-            ui.draw_subtitles(imgBackground) # Calls refresh logic internally
-
+            ui.draw_status_bar(canvas, current_status)
+            ui.draw_perf(canvas, display.perf_text())
+            # One subtitle blend per frame (new text, or the active one while its timer runs)
+            ui.draw_subtitles(canvas, user_text=new_user_text, ai_text=new_ai_text)
+            timer.mark('draw')
 
-            cv2.imshow("Face Attendance", imgBackground)
-            if cv2.waitKey(1) == ord('q'):
+            key = display.show(canvas)
+            timer.mark('show')
+            if key == ord('q'):
                 break
                 
     except KeyboardInterrupt:
         print("Stopping...")
     finally:
-        cap.release()
-        cv2.destroyAllWindows()
+        vision.stop()
+        if perception:
+            for name, s in perception.stats().items():
+                print(f"Perception {name}: {s['results']} results, {s['mean_latency_ms']:.0f} ms mean latency "
+                      f"({s['mean_compute_ms']:.0f} ms compute), {s['restarts']} restarts")
+            perception.stop()
+        if capture:
+            capture.stop()
+        if ring:
+            ring.close()
+        if cap:
+            cap.release()
+        stats = vision.identity_cache.stats()
+        print(f"Identity cache: {stats['hit_rate']:.0%} hit rate ({stats['hits']} hits, {stats['misses']} misses), "
+              f"{vision.encoder_calls} encoder calls over {vision.detections} detections")
+        display.close()
         if speech_thread:
             speech_thread.stop()
+        if metrics_log:
+            metrics_log.stop()
+        print("📊 Pipeline timings (ms)\n" + metrics.report())
+        print(voice_trace.report())
+        print(tts_registry.report())
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,202 @@
+"""
+Pipeline instrumentation for OMNIS.
+
+Every stage of the vision and voice pipelines records how long it took
+(milliseconds) into a named histogram:
+
+    with metrics.timer('vision.detect'):
+        ...
+
+    @metrics.timed('vision.match')
+    def match(...): ...
+
+    metrics.record('capture.age', ms)
+
+Each histogram keeps the last METRICS_WINDOW samples in a ring buffer, so
+p50/p95/p99 describe recent behaviour, plus lifetime count/mean/max.
+Recording is a lock and an array store; percentiles are only computed when
+someone asks for a snapshot.
+
+Snapshots can be pulled while OMNIS runs:
+
+- `kill -USR1 <pid>` prints a report to the console
+- OMNIS_METRICS_PORT=<port>: GET http://127.0.0.1:<port>/metrics returns JSON
+- OMNIS_METRICS_LOG=<path>: a JSON line is appended every
+  OMNIS_METRICS_INTERVAL seconds
+"""
+import functools
+import json
+import os
+import signal
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+METRICS_WINDOW = 1024
+METRICS_PORT = int(os.environ.get('OMNIS_METRICS_PORT', '0'))  # 0 = no HTTP endpoint
+METRICS_LOG = os.environ.get('OMNIS_METRICS_LOG', '')
+METRICS_INTERVAL = float(os.environ.get('OMNIS_METRICS_INTERVAL', '30'))
+PERCENTILES = (50, 95, 99)
+
+
+class Histogram:
+    def __init__(self, window=METRICS_WINDOW):
+        self.samples = np.zeros(window, dtype=np.float64)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, value):
+        value = float(value)
+        self.samples[self.count % len(self.samples)] = value
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def summary(self):
+        recent = self.samples[:min(self.count, len(self.samples))]
+        report = {'count': self.count, 'mean': self.total / max(1, self.count), 'max': self.max}
+        if len(recent):
+            for p, v in zip(PERCENTILES, np.percentile(recent, PERCENTILES)):
+                report[f'p{p}'] = float(v)
+        return report
+
+
+_histograms = {}
+_lock = threading.Lock()
+_started = False
+
+
+def record(name, ms):
+    """Adds one sample (milliseconds) to the named histogram."""
+    with _lock:
+        hist = _histograms.get(name)
+        if hist is None:
+            hist = _histograms[name] = Histogram()
+        hist.record(ms)
+
+
+@contextmanager
+def timer(name):
+    """Times the `with` block into the named histogram (also when it raises)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, (time.perf_counter() - start) * 1000)
+
+
+def timed(name):
+    """Decorator form of timer()."""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with timer(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def snapshot():
+    """Returns {name: {count, mean, max, p50, p95, p99}} in milliseconds, sorted by name."""
+    with _lock:
+        return {name: _histograms[name].summary() for name in sorted(_histograms)}
+
+
+def report():
+    lines = [f"{'stage':<28}{'count':>8}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}"]
+    for name, s in snapshot().items():
+        lines.append(f"{name:<28}{s['count']:>8}{s.get('p50', 0):>9.1f}{s.get('p95', 0):>9.1f}"
+                     f"{s.get('p99', 0):>9.1f}{s['max']:>9.1f}")
+    return '\n'.join(lines)
+
+
+def reset():
+    with _lock:
+        _histograms.clear()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip('/') not in ('', '/metrics'):
+            self.send_error(404)
+            return
+        body = json.dumps({'time': time.time(), 'stages': snapshot()}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # keep the console for OMNIS
+
+
+def serve(port=METRICS_PORT):
+    """Serves GET /metrics on 127.0.0.1:`port` from a daemon thread. Returns the server."""
+    server = ThreadingHTTPServer(('127.0.0.1', port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True).start()
+    return server
+
+
+class MetricsLogger(threading.Thread):
+    """Appends a {"time", "stages"} JSON line to `path` every `interval` seconds."""
+
+    def __init__(self, path=METRICS_LOG, interval=METRICS_INTERVAL):
+        threading.Thread.__init__(self, name='metrics-log', daemon=True)
+        self.path = path
+        self.interval = interval
+        self.stop_event = threading.Event()
+
+    def write(self):
+        line = json.dumps({'time': time.time(), 'stages': snapshot()})
+        try:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+        except OSError as e:
+            print(f"⚠️ Could not write metrics log: {e}")
+
+    def run(self):
+        while not self.stop_event.wait(self.interval):
+            self.write()
+
+    def stop(self):
+        self.stop_event.set()
+        self.write()
+
+
+def _dump_on_signal(signum, frame):
+    print("\n📊 Pipeline timings (ms)\n" + report() + "\n")
+
+
+def init_metrics(port=METRICS_PORT, log_path=METRICS_LOG, interval=METRICS_INTERVAL):
+    """
+    Sets up the dump paths configured by the environment. Call once from the main thread.
+    Returns: the MetricsLogger (or None) so the caller can stop() it on exit.
+    """
+    global _started
+    if _started:
+        return None
+    _started = True
+
+    if hasattr(signal, 'SIGUSR1'):  # not on Windows
+        try:
+            signal.signal(signal.SIGUSR1, _dump_on_signal)
+        except ValueError:
+            pass  # not the main thread
+    if port:
+        try:
+            serve(port)
+            print(f"📊 Metrics at http://127.0.0.1:{port}/metrics")
+        except OSError as e:
+            print(f"⚠️ Metrics endpoint unavailable: {e}")
+    logger = None
+    if log_path:
+        logger = MetricsLogger(log_path, interval)
+        logger.start()
+    return logger
@@ -0,0 +1,221 @@
+"""
+Process-parallel perception for OMNIS.
+
+Gesture (debounced MediaPipe Hands) and mood (MediaPipe FaceMesh) each run in their
+own worker process, so they use their own cores and never stall the render
+loop. The render loop only calls `submit()` (never blocks) and `poll()` /
+`latest()` to read whatever each model finished last.
+
+- Input: a bounded queue per worker (size 1, oldest request dropped). When a
+  FrameRing is available only the sequence number crosses the queue and the
+  worker reads the frame from shared memory; otherwise the frame is pickled.
+- Output: every result goes back on a queue; `poll()` drains it and keeps
+  only the newest result per model. Event models (a debounced gesture is
+  reported on one run only) also queue every non-None result until
+  `take_events()` collects it, so a gesture can't be overwritten by the next
+  run's None between two polls.
+- Supervision: a worker that dies is restarted (with fresh queues, at most
+  once per PERCEPTION_RESTART_DELAY seconds) and its restarts are counted.
+"""
+import importlib
+import multiprocessing as mp
+import os
+import queue
+import time
+from collections import deque, namedtuple
+
+import cv2
+
+import metrics
+from frame_ring import FrameRing
+
+PERCEPTION_INTERVAL = float(os.environ.get('PERCEPTION_INTERVAL', '0.1'))
+PERCEPTION_RESTART_DELAY = 1.0
+
+# name -> (module, class, method, takes_faces); imported inside the worker so MediaPipe only loads there.
+# Models that take faces get the (key, box) list passed to submit() as a second argument.
+PERCEPTION_MODELS = {
+    'gesture': ('gesture_manager', 'GestureEngine', 'detect_gesture', False),
+    'emotion': ('emotion_manager', 'EmotionManager', 'detect_emotions', True),
+}
+
+# Models whose non-None results are one-shot events rather than a state
+EVENT_MODELS = ('gesture',)
+EVENT_BACKLOG = 32
+
+# seq: frame sequence number the value was computed from, latency: seconds from capture to result
+PerceptionResult = namedtuple("PerceptionResult", ["name", "seq", "frame_time", "value", "latency", "compute"])
+
+
+def _perception_loop(name, ring_spec, in_queue, out_queue, stop_event):
+    module, cls, method, takes_faces = PERCEPTION_MODELS[name]
+    model = getattr(importlib.import_module(module), cls)()
+    detect = getattr(model, method)
+    ring = FrameRing.attach(**ring_spec) if ring_spec else None
+
+    try:
+        while not stop_event.is_set():
+            try:
+                seq, frame_time, frame, faces = in_queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+
+            if frame is None:
+                if ring is None:
+                    continue
+                item = ring.latest()
+                if item is None:
+                    continue
+                seq, frame_time, frame = item
+                rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+                if not ring.is_current(seq):
+                    continue  # slot was overwritten while we copied it
+            else:
+                rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+
+            start = time.time()
+            value = detect(rgb, faces or []) if takes_faces else detect(rgb)
+            done = time.time()
+            out_queue.put(PerceptionResult(name, seq, frame_time, value, done - frame_time, done - start))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if ring:
+            ring.close()
+
+
+class _WorkerHandle:
+    def __init__(self, name, ring_spec):
+        self.name = name
+        self.ring_spec = ring_spec
+        self.process = None
+        self.in_queue = None
+        self.out_queue = None
+        self.stop_event = mp.Event()
+        self.started_at = 0.0
+        self.restarts = 0
+        self.dropped = 0
+
+    def start(self):
+        # Fresh queues every time: a worker killed mid-put can leave a queue unusable
+        self.in_queue = mp.Queue(maxsize=1)
+        self.out_queue = mp.Queue()
+        self.process = mp.Process(
+            target=_perception_loop,
+            args=(self.name, self.ring_spec, self.in_queue, self.out_queue, self.stop_event),
+            name=f"perception-{self.name}",
+            daemon=True,
+        )
+        self.process.start()
+        self.started_at = time.time()
+
+    def submit(self, item):
+        try:
+            self.in_queue.put_nowait(item)
+        except queue.Full:
+            # Replace the request the worker hasn't picked up yet with the newer frame
+            try:
+                self.in_queue.get_nowait()
+                self.dropped += 1
+            except queue.Empty:
+                pass
+            try:
+                self.in_queue.put_nowait(item)
+            except queue.Full:
+                self.dropped += 1
+
+    def stop(self, timeout=2.0):
+        self.stop_event.set()
+        if self.process:
+            self.process.join(timeout)
+            if self.process.is_alive():
+                self.process.terminate()
+
+
+class PerceptionSupervisor:
+    def __init__(self, ring_spec=None, models=tuple(PERCEPTION_MODELS), interval=PERCEPTION_INTERVAL):
+        self.ring_spec = ring_spec
+        self.interval = interval
+        self.workers = {name: _WorkerHandle(name, ring_spec) for name in models}
+        self.results = {}
+        self.events = {name: deque(maxlen=EVENT_BACKLOG) for name in models if name in EVENT_MODELS}
+        self.stats_by_model = {name: {'count': 0, 'latency_sum': 0.0, 'compute_sum': 0.0, 'max_latency': 0.0}
+                               for name in models}
+        self.last_submit = 0.0
+
+    def start(self):
+        for worker in self.workers.values():
+            worker.start()
+        return self
+
+    def submit(self, frame, seq, frame_time=None, faces=None):
+        """
+        Offers the current frame to every worker (rate limited to `interval`). Never blocks.
+        faces: optional (key, (top, right, bottom, left)) list in frame coordinates for models that take faces
+        """
+        now = time.time()
+        if now - self.last_submit < self.interval:
+            return
+        self.last_submit = now
+        # With shared memory the workers read the frame themselves; only the sequence number is sent
+        item = (seq, frame_time or now, None if self.ring_spec else frame, faces)
+        for worker in self.workers.values():
+            worker.submit(item)
+
+    def poll(self):
+        """Collects finished results and restarts crashed workers. Returns {name: newest PerceptionResult}."""
+        now = time.time()
+        for name, worker in self.workers.items():
+            while True:
+                try:
+                    result = worker.out_queue.get_nowait()
+                except (queue.Empty, OSError, EOFError):
+                    break
+                stats = self.stats_by_model[name]
+                stats['count'] += 1
+                stats['latency_sum'] += result.latency
+                stats['compute_sum'] += result.compute
+                stats['max_latency'] = max(stats['max_latency'], result.latency)
+                metrics.record(f"perception.{name}.compute", result.compute * 1000)
+                metrics.record(f"perception.{name}.latency", result.latency * 1000)
+                self.results[name] = result
+                if result.value is not None and name in self.events:
+                    self.events[name].append(result)
+
+            if not worker.process.is_alive() and not worker.stop_event.is_set():
+                if now - worker.started_at >= PERCEPTION_RESTART_DELAY:
+                    print(f"⚠️ Perception worker '{name}' died (exit {worker.process.exitcode}). Restarting...")
+                    worker.restarts += 1
+                    worker.start()
+        return self.results
+
+    def latest(self, name):
+        return self.results.get(name)
+
+    def take_events(self, name):
+        """Returns (and forgets) the non-None results of event model `name` since the last call, oldest first."""
+        events = self.events.get(name)
+        if not events:
+            return []
+        taken = list(events)
+        events.clear()
+        return taken
+
+    def stats(self):
+        report = {}
+        for name, s in self.stats_by_model.items():
+            n = max(1, s['count'])
+            worker = self.workers[name]
+            report[name] = {
+                'results': s['count'],
+                'mean_latency_ms': s['latency_sum'] / n * 1000,
+                'mean_compute_ms': s['compute_sum'] / n * 1000,
+                'max_latency_ms': s['max_latency'] * 1000,
+                'dropped': worker.dropped,
+                'restarts': worker.restarts,
+            }
+        return report
+
+    def stop(self):
+        for worker in self.workers.values():
+            worker.stop()
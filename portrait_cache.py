@@ -0,0 +1,82 @@
+"""
+Portrait thumbnails for the OMNIS side panel.
+
+Each person's photo from images/faces is decoded and resized once and then
+served from a small LRU cache, instead of being read from disk and decoded
+on every rendered frame. Photos may be .jpg, .jpeg or .png. A cached entry
+is re-checked against the file's mtime/size at most every
+PORTRAIT_CHECK_INTERVAL seconds, so a re-registered photo shows up without
+a restart. People with no photo (e.g. registered by voice) get the avatar.
+"""
+import os
+import time
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+from face_enrollment import IMAGE_EXTENSIONS
+
+PORTRAIT_SIZE = (216, 216)
+PORTRAIT_CACHE_SIZE = 64
+PORTRAIT_CHECK_INTERVAL = 2.0
+
+
+class PortraitCache:
+    def __init__(self, faces_dir, fallback_path=None, size=PORTRAIT_SIZE, capacity=PORTRAIT_CACHE_SIZE,
+                 check_interval=PORTRAIT_CHECK_INTERVAL):
+        self.faces_dir = faces_dir
+        self.size = size
+        self.capacity = capacity
+        self.check_interval = check_interval
+        self.entries = OrderedDict()  # person_id -> (path, stamp, image, checked_at)
+        self.loads = 0
+        self.hits = 0
+        self.fallback = self._load(fallback_path) if fallback_path else None
+        if self.fallback is None:
+            self.fallback = np.full((size[1], size[0], 3), 128, np.uint8)
+
+    def _load(self, path):
+        img = cv2.imread(path) if path and os.path.exists(path) else None
+        if img is None:
+            return None
+        self.loads += 1
+        return cv2.resize(img, self.size, interpolation=cv2.INTER_AREA)
+
+    def _find(self, person_id):
+        """Returns (path, (mtime_ns, size)) of the person's photo, or (None, None)."""
+        for ext in IMAGE_EXTENSIONS + tuple(e.upper() for e in IMAGE_EXTENSIONS):
+            path = os.path.join(self.faces_dir, person_id + ext)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            return path, (st.st_mtime_ns, st.st_size)
+        return None, None
+
+    def get(self, person_id):
+        """Returns the person's portrait (BGR, `size`), or the avatar if they have no readable photo."""
+        now = time.time()
+        entry = self.entries.get(person_id)
+        if entry is not None:
+            path, stamp, image, checked_at = entry
+            if now - checked_at < self.check_interval:
+                self.entries.move_to_end(person_id)
+                self.hits += 1
+                return image
+            new_path, new_stamp = self._find(person_id)
+            if (new_path, new_stamp) == (path, stamp):
+                self.entries[person_id] = (path, stamp, image, now)
+                self.entries.move_to_end(person_id)
+                self.hits += 1
+                return image
+
+        path, stamp = self._find(person_id)
+        image = self._load(path) if path else None
+        if image is None:
+            image = self.fallback
+        self.entries[person_id] = (path, stamp, image, now)
+        self.entries.move_to_end(person_id)
+        while len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+        return image
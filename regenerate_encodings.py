@@ -1,109 +1,63 @@
 """
 Regenerate Face Encodings
-This script deletes old encoding files and creates fresh encodings
-based on the current images in the images/faces folder.
+This script brings the encoding store in line with the current images in
+the images/faces folder. Only added or changed photos are re-encoded;
+pass --full to throw away the recorded hashes and re-encode everything,
+and --workers N to set the number of encoder processes (default: all cores).
 """
 
 import os
-import cv2
-import face_recognition
-import pickle
+from encoding_store import LEGACY_PICKLES, EncodingStore, migrate_legacy
+from face_enrollment import ENROLL_WORKERS, FACES_DIR, enrollment_args, incremental_build, list_face_images, print_report
 
-def regenerate_encodings():
+def regenerate_encodings(full=False, workers=ENROLL_WORKERS):
     print("=" * 50)
-    print("REGENERATING FACE ENCODINGS")
+    print("REGENERATING FACE ENCODINGS" + (" (FULL)" if full else ""))
     print("=" * 50)
     
-    # Step 1: Delete old encoding files
-    old_files = [
-        'encoded_file.p',
-        'images/encoded_file.p'
-    ]
-    
-    for file in old_files:
-        if os.path.exists(file):
-            os.remove(file)
-            print(f"✓ Deleted old encoding file: {file}")
-        else:
-            print(f"  (File not found: {file})")
+    # Step 1: Move legacy pickle files into images/encodings/ (keeps voice-registered faces)
+    try:
+        migrated = migrate_legacy(EncodingStore())
+    except Exception as e:
+        print(f"ERROR: Could not migrate legacy encodings ({e}). Leaving them in place.")
+        return
+    if migrated:
+        print(f"✓ Migrated {migrated} legacy encodings")
     
     print()
     
-    # Step 2: Load current images from faces folder
-    folderPath = r'images/faces'
-    
-    if not os.path.exists(folderPath):
-        print(f"ERROR: Folder '{folderPath}' does not exist!")
+    # Step 2: Check current images in faces folder
+    if not os.path.exists(FACES_DIR):
+        print(f"ERROR: Folder '{FACES_DIR}' does not exist!")
         return
     
-    PathList = os.listdir(folderPath)
+    PathList = list_face_images(FACES_DIR)
     
     if not PathList:
-        print(f"ERROR: No images found in '{folderPath}'!")
+        print(f"ERROR: No images found in '{FACES_DIR}'!")
         return
     
-    print(f"Found {len(PathList)} images in {folderPath}:")
-    for path in PathList:
-        print(f"  - {path}")
-    
+    print(f"Found {len(PathList)} images in {FACES_DIR}")
     print()
     
-    # Step 3: Load images and extract IDs
-    imgList = []
-    studentIds = []
-    
-    for path in PathList:
-        img_path = os.path.join(folderPath, path)
-        img = cv2.imread(img_path)
-        
-        if img is None:
-            print(f"WARNING: Could not read image: {path}")
-            continue
-        
-        imgList.append(img)
-        studentIds.append(path.split('.')[0])
-    
-    print(f"Successfully loaded {len(imgList)} images")
-    print(f"Student IDs: {studentIds}")
-    print()
-    
-    # Step 4: Generate encodings
+    # Step 3: Encode only what changed since the last run
     print("Encoding faces... (this may take a moment)")
-    encode_list = []
-    
-    for i, img in enumerate(imgList):
-        img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-        encodings = face_recognition.face_encodings(img_rgb)
-        
-        if len(encodings) == 0:
-            print(f"WARNING: No face detected in {PathList[i]}")
-            continue
-        
-        encode_list.append(encodings[0])
-        print(f"  ✓ Encoded: {studentIds[i]}")
-    
-    print()
-    
-    # Step 5: Save new encoding files
-    encode_list_known_with_ids = [encode_list, studentIds[:len(encode_list)]]
+    report = incremental_build(FACES_DIR, force=full, workers=workers)
+    print_report(report)
     
-    # Save to both locations
-    save_locations = [
-        'encoded_file.p',
-        'images/encoded_file.p'
-    ]
-    
-    for location in save_locations:
-        with open(location, 'wb') as f:
-            pickle.dump(encode_list_known_with_ids, f)
-        print(f"✓ Saved new encoding file: {location}")
+    # Step 4: Everything is in the store now; the legacy pickles are superseded
+    for file in LEGACY_PICKLES:
+        if os.path.exists(file):
+            os.remove(file)
+            print(f"✓ Deleted old encoding file: {file}")
     
     print()
     print("=" * 50)
     print("ENCODING REGENERATION COMPLETE!")
     print("=" * 50)
-    print(f"Total faces encoded: {len(encode_list)}")
+    print(f"Total faces encoded: {report['total']}")
     print("You can now run your OMNIS robot with fresh encodings.")
 
 if __name__ == '__main__':
-    regenerate_encodings()
+    args = enrollment_args("Bring the encoding store in line with the images in images/faces.")
+    regenerate_encodings(full=args.full, workers=args.workers)
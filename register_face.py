@@ -1,9 +1,9 @@
 import os
-import pickle
 import cv2
 import numpy as np
 
-ENCODE_FILE = 'encoded_file.p'
+from encoding_store import EncodingStore, load_encodings
+
 FACES_DIR = 'images/faces'
 
 def _safe_name(name: str) -> str:
@@ -16,7 +16,7 @@ def _safe_name(name: str) -> str:
 def register_name(name: str, encoding, face_image=None):
     """Register `name` for the provided face encoding and optional image.
 
-    - Appends the encoding and name to `encoded_file.p`.
+    - Appends the encoding and name to the binary encoding store (O(1), no rewrite).
     - Saves `face_image` to `images/faces/<NAME>.jpg` if provided.
     Returns True on success.
     """
@@ -35,25 +35,11 @@ def register_name(name: str, encoding, face_image=None):
         except Exception as e:
             print(f"[register_face] Failed to write face image: {e}")
 
-    # Load existing encodings (if any), append and write back atomically
+    # Append one row to the store (migrating a legacy pickle first if needed)
     try:
-        if os.path.exists(ENCODE_FILE):
-            with open(ENCODE_FILE, 'rb') as f:
-                data = pickle.load(f)
-            encode_list_known, studentIds = data
-        else:
-            encode_list_known, studentIds = [], []
-
-        # Append
-        encode_list_known.append(encoding)
-        studentIds.append(person)
-
-        # Write to temp file and replace
-        tmp = ENCODE_FILE + '.tmp'
-        with open(tmp, 'wb') as f:
-            pickle.dump((encode_list_known, studentIds), f)
-        os.replace(tmp, ENCODE_FILE)
-        print(f"[register_face] Registered {person} (encodings={len(studentIds)})")
+        load_encodings()
+        count = EncodingStore().append(encoding, person)
+        print(f"[register_face] Registered {person} (encodings={count})")
         return True
     except Exception as e:
         print(f"[register_face] Error saving encoding: {e}")
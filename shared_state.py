@@ -16,7 +16,8 @@ awaiting_face_image: Optional[object] = None
 detected_people = [] # Live list of people currently in frame
 active_user: str = "Unknown" # The primary person being interacted with
 current_personality: str = "default" # Current persona (e.g., 'Shakespeare', 'NASA Scientist')
-active_user_mood: str = "Neutral" # Predicted mood (Happy, Neutral, etc.)
+active_user_mood: str = "Neutral" # Predicted mood (Happy, Neutral, etc.) of the active user
+user_moods: dict = {} # Smoothed mood per person in frame (person ID, or "track:<n>" for unknown faces)
 current_voice_settings: dict = {"pitch": 50, "speed": 175, "accent": "com"} # Added for voice modulation
 
 # Interaction State
@@ -1,11 +1,13 @@
+import functools
 import os
+import queue
 import threading
 import time
-import uuid
-import pygame
 import asyncio
 import edge_tts
 import re
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from gtts import gTTS
 
 try:
@@ -15,20 +17,40 @@ except ImportError:
     HAS_CARTESIA = False
 
 try:
-    from elevenlabs import save
     from elevenlabs.client import ElevenLabs
     HAS_ELEVEN = True
 except ImportError:
     HAS_ELEVEN = False
 
+# Sentences synthesized ahead of (and concurrently with) the one playing
+TTS_LOOKAHEAD = int(os.environ.get('TTS_LOOKAHEAD', '3'))
+# Keep synthesized phrases on disk and replay them (0 = always synthesize)
+TTS_CACHE_ENABLED = os.environ.get('TTS_CACHE', '1') != '0'
+# Seconds before a premium provider's request is given up on
+TTS_PROVIDER_TIMEOUT = float(os.environ.get('TTS_PROVIDER_TIMEOUT', '8'))
+
 # Shared state to check if speaker is active
 _global_speaker_active = False
-_stop_requested = False
+# Bumped by every stop: speech queued under an older epoch is stale and dropped
+_speaking_epoch = 0
 
 def is_speaking():
     return _global_speaker_active
 
+def speaking_epoch():
+    """
+    The current speaking epoch. A producer streaming a reply sentence by
+    sentence takes it before the first sentence and passes it to speak(), so
+    sentences that arrive after a stop (barge-in) are discarded.
+    """
+    return _speaking_epoch
+
 import shared_state
+import metrics
+import voice_trace
+from audio_output import AudioOutput
+from tts_cache import TTSCache
+from tts_providers import ProviderRegistry
 
 # Voice Mappings
 VOICE_MAP = {
@@ -62,69 +84,173 @@ def get_voice():
     persona = getattr(shared_state, 'current_personality', 'default')
     return VOICE_MAP.get(persona, VOICE_MAP["default"])
 
-async def generate_edge_tts(text, filename):
-    voice = get_voice()
-    communicate = edge_tts.Communicate(text, voice)
-    await communicate.save(filename)
+def voice_for(provider, persona):
+    """The voice `provider` uses for `persona` (part of the TTS cache key)."""
+    if provider == 'elevenlabs':
+        return ELEVEN_VOICE_MAP.get(persona, ELEVEN_VOICE_MAP["default"])
+    if provider == 'cartesia':
+        return CARTESIA_VOICE_MAP.get(persona, CARTESIA_VOICE_MAP["default"])
+    if provider == 'edge':
+        return VOICE_MAP.get(persona, VOICE_MAP["default"])
+    v = getattr(shared_state, 'current_voice_settings', {"accent": "com"})
+    return f"gtts-{v.get('accent', 'com')}"
 
-def generate_cartesia_tts(text, filename):
-    if not HAS_CARTESIA: return False
+def stream_edge_tts(text):
+    """Yields MP3 chunks from edge-tts as they arrive (drives its async stream on a private event loop)."""
+    loop = asyncio.new_event_loop()
     try:
-        api_key = os.environ.get('CARTESIA_API_KEY')
-        if not api_key:
+        stream = edge_tts.Communicate(text, get_voice()).stream().__aiter__()
+        while True:
             try:
-                import secrets_local
-                api_key = getattr(secrets_local, 'CARTESIA_API_KEY', None)
-            except ImportError: pass
-        if not api_key: return False
-        client = Cartesia(api_key=api_key)
-        persona = getattr(shared_state, 'current_personality', 'default')
-        voice_id = CARTESIA_VOICE_MAP.get(persona, CARTESIA_VOICE_MAP["default"])
-        data = client.tts.bytes(model_id="sonic-2", transcript=text, voice_id=voice_id, output_format={"container": "mp3", "bit_rate": 128000, "sample_rate": 44100})
-        with open(filename, "wb") as f: f.write(data)
-        return True
-    except Exception as e:
-        print(f"Cartesia Error: {e}")
-        return False
+                chunk = loop.run_until_complete(stream.__anext__())
+            except StopAsyncIteration:
+                break
+            if chunk.get("type") == "audio":
+                yield chunk["data"]
+    finally:
+        loop.close()
 
-current_eleven_key_index = 0
+def _secrets():
+    try:
+        import secrets_local
+        return secrets_local
+    except ImportError:
+        return None
 
-def generate_elevenlabs_tts(text, filename):
-    if not HAS_ELEVEN: return False
-    global current_eleven_key_index
+@functools.lru_cache(maxsize=None)
+def _cartesia_key():
+    return os.environ.get('CARTESIA_API_KEY') or getattr(_secrets(), 'CARTESIA_API_KEY', None)
+
+@functools.lru_cache(maxsize=None)
+def _eleven_keys():
     keys = []
     env_key = os.environ.get('ELEVENLABS_API_KEY')
     if env_key: keys.append(env_key)
-    try:
-        import secrets_local
-        if hasattr(secrets_local, 'ELEVENLABS_KEYS'):
-            for k in secrets_local.ELEVENLABS_KEYS:
-                if k and k not in keys: keys.append(k)
-        elif hasattr(secrets_local, 'ELEVENLABS_API_KEY'):
-            keys.append(secrets_local.ELEVENLABS_API_KEY)
-    except: pass
-    if not keys: return False
-    
+    secrets_local = _secrets()
+    if hasattr(secrets_local, 'ELEVENLABS_KEYS'):
+        for k in secrets_local.ELEVENLABS_KEYS:
+            if k and k not in keys: keys.append(k)
+    elif hasattr(secrets_local, 'ELEVENLABS_API_KEY'):
+        keys.append(secrets_local.ELEVENLABS_API_KEY)
+    return tuple(keys)
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+def _client(factory, key):
+    """One long-lived SDK client per (SDK, API key), so its connections are reused sentence after sentence."""
+    with _clients_lock:
+        client = _clients.get((factory, key))
+        if client is None:
+            try:
+                client = factory(api_key=key, timeout=TTS_PROVIDER_TIMEOUT)
+            except TypeError:
+                client = factory(api_key=key)  # SDK without a timeout option
+            _clients[(factory, key)] = client
+        return client
+
+def stream_cartesia_tts(text):
+    client = _client(Cartesia, _cartesia_key())
+    persona = getattr(shared_state, 'current_personality', 'default')
+    voice_id = CARTESIA_VOICE_MAP.get(persona, CARTESIA_VOICE_MAP["default"])
+    data = client.tts.bytes(model_id="sonic-2", transcript=text, voice_id=voice_id, output_format={"container": "mp3", "bit_rate": 128000, "sample_rate": 44100})
+    # Older SDKs return the whole clip, newer ones an iterator of chunks
+    if isinstance(data, (bytes, bytearray)):
+        yield bytes(data)
+    else:
+        yield from data
+
+current_eleven_key_index = 0
+
+def stream_elevenlabs_tts(text):
+    global current_eleven_key_index
+    keys = _eleven_keys()
     attempts = 0
-    while attempts < len(keys):
-        key = keys[current_eleven_key_index]
+    while True:
+        key = keys[current_eleven_key_index % len(keys)]
+        streamed = False
         try:
-            client = ElevenLabs(api_key=key)
+            client = _client(ElevenLabs, key)
             persona = getattr(shared_state, 'current_personality', 'default')
             voice_id = ELEVEN_VOICE_MAP.get(persona, ELEVEN_VOICE_MAP["default"])
-            audio = client.text_to_speech.convert(text=text, voice_id=voice_id, model_id="eleven_turbo_v2")
-            save(audio, filename)
-            return True
+            # convert() streams: errors (quota etc.) surface while iterating
+            for chunk in client.text_to_speech.convert(text=text, voice_id=voice_id, model_id="eleven_turbo_v2"):
+                streamed = True
+                yield chunk
+            return
         except Exception as e:
-            if "quota" in str(e).lower() or "401" in str(e).lower():
+            attempts += 1
+            if not streamed and attempts < len(keys) and ("quota" in str(e).lower() or "401" in str(e).lower()):
                 current_eleven_key_index = (current_eleven_key_index + 1) % len(keys)
-                attempts += 1
-            else: return False
-    return False
+            else:
+                raise  # every key exhausted, or not a key problem: the registry counts the failure
+
+def stream_gtts(text):
+    v = getattr(shared_state, 'current_voice_settings', {"accent": "com"})
+    yield from gTTS(text=text, lang='en', tld=v.get('accent', 'com')).stream()
+
+# Preference order; the registry skips unconfigured providers, trips breakers and orders by latency
+tts_registry = ProviderRegistry()
+tts_registry.register('elevenlabs', stream_elevenlabs_tts, lambda: HAS_ELEVEN and bool(_eleven_keys()))
+tts_registry.register('cartesia', stream_cartesia_tts, lambda: HAS_CARTESIA and bool(_cartesia_key()))
+tts_registry.register('edge', stream_edge_tts)
+tts_registry.register('gtts', stream_gtts)
+
+def stream_tts(text):
+    """Yields (provider, mp3_chunk) from the first provider that produces audio for `text`."""
+    for provider in tts_registry.candidates():
+        call = tts_registry.begin(provider)
+        if call is None:
+            continue  # another sentence is already probing it
+        produced = False
+        start = time.perf_counter()
+        try:
+            for chunk in provider.stream(text):
+                if chunk:
+                    if not produced:
+                        produced = True
+                        first_audio = time.perf_counter() - start
+                    yield provider.name, chunk
+            if produced:
+                tts_registry.success(call, first_audio)
+                return
+            tts_registry.failure(call, "no audio")
+        except Exception as e:
+            print(f"{provider.name} TTS Error: {e}")
+            tts_registry.failure(call, e)
+            if produced:
+                raise  # cut off mid-sentence: too late to fall back, and the clip must not be cached
+        finally:
+            # Closed early (the sentence was cancelled by a stop): don't leave a probe hanging
+            tts_registry.release(call)
+
+def cached_stream_tts(text, cache=None, store=True):
+    """
+    stream_tts() behind the phrase cache: yields ('cache', mp3) if any provider's rendering of
+    `text` in the current persona's voice is cached, otherwise streams from the providers and
+    (if `store`) caches the clip once it is complete.
+    """
+    persona = getattr(shared_state, 'current_personality', 'default')
+    if cache is not None:
+        _, data = cache.get_any([(name, voice_for(name, persona), persona) for name in tts_registry.names()], text)
+        if data:
+            yield 'cache', data
+            return
+    chunks, provider = [], None
+    for provider, chunk in stream_tts(text):
+        if store and cache is not None:
+            chunks.append(chunk)
+        yield provider, chunk
+    if chunks:
+        cache.put(provider, voice_for(provider, persona), persona, text, b"".join(chunks))
 
 def split_text_to_sentences(text):
     return [s.strip() for s in re.split(r'(?<=[.!?\n]) +', text) if s.strip()]
 
+def speech_units(text):
+    """The pieces speak() synthesizes `text` as (long text is split into sentences)."""
+    return split_text_to_sentences(text) if len(text) > 120 else [text]
+
 def speak_offline(text):
     try:
         import audio_config
@@ -163,126 +289,212 @@ def get_usb_audio_index():
 
 # ------------------------------
 
+class SynthesisJob:
+    """One sentence being synthesized. Its MP3 chunks are buffered in `chunks` (None marks the end)."""
+    def __init__(self, text, trace=None, filler=False, cache=True, epoch=0):
+        self.text = text
+        self.trace = trace
+        self.filler = filler
+        self.cache = cache  # store the clip in the phrase cache once synthesized
+        self.epoch = epoch
+        self.chunks = queue.Queue()
+        self.cancelled = threading.Event()
+        self.future = None  # pool future, so a job that no worker has picked up yet never runs
+        self.leads = False  # first answer sentence of its trace: marks synth_start / first_chunk
+        self.started = False  # playback of this job has begun
+        self.continues = False  # queued while earlier speech was still queued or playing
+
+    def cancel(self):
+        self.cancelled.set()
+        if self.future is not None:
+            self.future.cancel()
+
+
 class GTTSThread(threading.Thread):
-    def __init__(self):
+    """
+    Speaks queued sentences. Up to TTS_LOOKAHEAD upcoming sentences are
+    synthesized concurrently on a thread pool; a feeder thread hands them to
+    a long-lived AudioOutput strictly in order, streaming the sentence being
+    played as its chunks arrive, so a long answer plays back to back instead
+    of waiting for each sentence's synthesis in turn.
+    """
+    def __init__(self, lookahead=TTS_LOOKAHEAD):
         threading.Thread.__init__(self)
         self.pending_queue = []
-        self.playback_queue = []
+        self.active = deque()  # jobs submitted to the pool, in playback order
+        self.lead_trace = None  # trace whose first answer sentence was submitted last
+        self.lookahead = max(1, lookahead)
+        self.pool = ThreadPoolExecutor(max_workers=self.lookahead, thread_name_prefix='tts')
         self.is_generating = False
         self.lock = threading.Lock()
+        self.output_lock = threading.Lock()
         self.running = True
+        # Device is looked up again whenever the player (re)starts, e.g. after a USB replug
+        self.output = AudioOutput(lambda: f"plughw:{get_usb_audio_index()},0")
+        self.cache = None
+        if TTS_CACHE_ENABLED:
+            try:
+                self.cache = TTSCache()
+            except OSError as e:
+                print(f"⚠️ TTS cache unavailable: {e}")
+
+    def _produce(self, job):
+        """Pool worker: synthesizes one sentence into job.chunks."""
+        if job.cancelled.is_set():
+            return  # stopped before a worker got to it: don't call the providers
+        synth_start = time.perf_counter()
+        if job.leads:
+            voice_trace.mark(job.trace, 'synth_start', synth_start)
+        provider, first = None, True
+        try:
+            for provider, chunk in cached_stream_tts(job.text, self.cache, store=job.cache):
+                if job.cancelled.is_set():
+                    return
+                if first:
+                    first = False
+                    metrics.record('tts.first_chunk', (time.perf_counter() - synth_start) * 1000)
+                    if job.leads:
+                        # Later sentences synthesize concurrently and may deliver first: only the lead counts
+                        voice_trace.mark(job.trace, 'first_chunk')
+                job.chunks.put(chunk)
+            if provider:
+                synth_ms = (time.perf_counter() - synth_start) * 1000
+                metrics.record('tts.synth', synth_ms)
+                metrics.record(f'tts.synth.{provider}', synth_ms)
+            else:
+                print(f"Gen Error: no TTS provider produced audio for '{job.text[:40]}'")
+        except Exception as e:
+            print(f"Gen Error: {e}")
+        finally:
+            job.chunks.put(None)
+
+    def _fill_lookahead(self):
+        """Submits pending sentences until TTS_LOOKAHEAD are in flight."""
+        self.lock.acquire()
+        while self.pending_queue and len(self.active) < self.lookahead:
+            job = SynthesisJob(*self.pending_queue.pop(0))
+            if job.epoch != _speaking_epoch:
+                continue  # queued while a stop was in progress
+            job.continues = bool(self.active) or self.output.busy()
+            if not job.filler and job.trace is not None and job.trace is not self.lead_trace:
+                job.leads = True
+                self.lead_trace = job.trace
+            self.active.append(job)
+            job.future = self.pool.submit(self._produce, job)
+        self.is_generating = bool(self.pending_queue or self.active)
+        self.lock.release()
+
+    def _feed(self, job, chunk):
+        """Plays one chunk of the sentence at the head of the queue."""
+        with self.output_lock:
+            if job.cancelled.is_set():
+                return
+            until = self.output.play_until
+            heard_at = self.output.write(chunk)
+        if heard_at is None:
+            return
+        if job.continues and not job.started and until:
+            # Silence between two sentences of one reply: synthesis didn't keep up
+            metrics.record('tts.gap', max(0.0, heard_at - until) * 1000)
+        job.started = True
+        voice_trace.mark(job.trace, 'filler_audio' if job.filler else 'first_audio', heard_at)
 
     def run(self):
         global _global_speaker_active
         
-        def generator_loop():
+        def feeder_loop():
+            current = None
             while self.running:
-                text_to_gen = None
+                self._fill_lookahead()
                 self.lock.acquire()
-                if self.pending_queue:
-                    text_to_gen = self.pending_queue.pop(0)
-                    self.is_generating = True
-                else:
-                    self.is_generating = False
+                job = self.active[0] if self.active else None
                 self.lock.release()
-                
-                if text_to_gen:
-                    fn = f"speak_{uuid.uuid4()}.mp3"
-                    try:
-                        if not generate_elevenlabs_tts(text_to_gen, fn):
-                            if not generate_cartesia_tts(text_to_gen, fn):
-                                try: asyncio.run(generate_edge_tts(text_to_gen, fn))
-                                except:
-                                    v = getattr(shared_state, 'current_voice_settings', {"accent": "com"})
-                                    gTTS(text=text_to_gen, lang='en', tld=v.get('accent', 'com')).save(fn)
-                        
-                        self.lock.acquire()
-                        self.playback_queue.append(fn)
-                        self.lock.release()
-                    except Exception as e: print(f"Gen Error: {e}")
-                else: time.sleep(0.05)
-
-        threading.Thread(target=generator_loop, daemon=True).start()
+                if job is None:
+                    time.sleep(0.02)
+                    continue
+                if job is not current:
+                    current = job
+                    self.output.begin()
+                try:
+                    chunk = job.chunks.get(timeout=0.05)
+                except queue.Empty:
+                    continue
+                if chunk is not None:
+                    self._feed(job, chunk)
+                    continue
+                # Sentence complete: on to the next one
+                with self.output_lock:
+                    if not job.cancelled.is_set():
+                        self.output.end()
+                        if job.started:
+                            metrics.record('tts.playback', self.output.clip_seconds * 1000)
+                self.lock.acquire()
+                if self.active and self.active[0] is job:
+                    self.active.popleft()
+                self.lock.release()
+
+        threading.Thread(target=feeder_loop, daemon=True).start()
 
+        # Speaking until everything queued is synthesized and the output has played it
         while self.running:
-            fn = None
             self.lock.acquire()
-            if self.playback_queue: fn = self.playback_queue.pop(0)
+            pending = bool(self.pending_queue or self.active)
             self.lock.release()
+            if not pending and not self.output.busy():
+                _global_speaker_active = False
+            time.sleep(0.05)
+        self.pool.shutdown(wait=False)
+        self.output.close()
 
-            if fn:
-                _global_speaker_active = True
-                try:
-                    # DYNAMICALLY GET CARD INDEX
-                    card_index = get_usb_audio_index()
-                    # Using plughw for better compatibility with different sample rates
-                    device_str = f"plughw:{card_index},0"
-                    
-                    played = False
-                    if os.name != 'nt':
-                        # Try mpg123 first - it's more reliable for ALSA devices
-                        # Redirect both stdout and stderr to suppress ALSA warnings
-                        import subprocess
-                        try:
-                            result = subprocess.run(
-                                ['mpg123', '-q', '-a', device_str, fn],
-                                stdout=subprocess.DEVNULL,
-                                stderr=subprocess.DEVNULL,
-                                timeout=30
-                            )
-                            if result.returncode == 0:
-                                played = True
-                        except (subprocess.TimeoutExpired, FileNotFoundError):
-                            pass
-
-                    if not played:
-                        # Fallback to pygame if mpg123 fails
-                        try:
-                            if not pygame.mixer.get_init():
-                                # Initialize pygame mixer with ALSA-friendly settings
-                                pygame.mixer.init(frequency=44100, size=-16, channels=2, buffer=2048)
-                            pygame.mixer.music.load(fn)
-                            pygame.mixer.music.play()
-                            while pygame.mixer.music.get_busy() and not _stop_requested: 
-                                time.sleep(0.05)
-                            if _stop_requested: 
-                                pygame.mixer.music.stop()
-                            if hasattr(pygame.mixer.music, 'unload'): 
-                                pygame.mixer.music.unload()
-                            played = True
-                        except Exception as pygame_error:
-                            print(f"Pygame playback failed: {pygame_error}")
-
-                    if os.path.exists(fn): 
-                        try:
-                            os.remove(fn)
-                        except:
-                            pass
-                            
-                except Exception as e: 
-                    print(f"Play Error: {e}")
-            else:
-                self.lock.acquire()
-                if not self.pending_queue and not self.playback_queue and not self.is_generating:
-                    _global_speaker_active = False
-                self.lock.release()
-                time.sleep(0.1)
-
-    def speak(self, text):
+    def speak(self, text, trace=None, filler=False, cache=True, epoch=None):
+        """
+        Queues `text` for synthesis and playback.
+        trace: VoiceTrace of the utterance being answered (marks synthesis and first audio)
+        filler: True for thinking fillers, which don't count as the answer starting
+        cache: False for one-off text (LLM answers) that isn't worth keeping in the phrase cache
+        epoch: speaking_epoch() the text belongs to; dropped if speech was stopped since
+        Returns: False if the text was dropped as stale
+        """
         global _global_speaker_active
+        if epoch is None:
+            epoch = _speaking_epoch
+        elif epoch != _speaking_epoch:
+            return False
         _global_speaker_active = True
-        sentences = split_text_to_sentences(text) if len(text) > 120 else [text]
         self.lock.acquire()
-        self.pending_queue.extend(sentences)
+        self.pending_queue.extend((s, trace, filler, cache, epoch) for s in speech_units(text))
         self.lock.release()
+        return True
 
     def stop(self):
-        global _stop_requested
-        _stop_requested = True
+        """
+        Barge-in: cuts off the audio playing now, drops everything queued and
+        cancels synthesis in flight. Sentences of the interrupted reply that are
+        still on their way (speak() with the old epoch) are discarded.
+        """
+        global _speaking_epoch
+        stop_start = time.perf_counter()
+        _speaking_epoch += 1
         self.lock.acquire()
         self.pending_queue = []
-        # We can't easily clear playback queue without deleting files
+        busy = False
+        for job in self.active:
+            job.cancel()  # queued synthesis never starts, in-flight synthesis stops at its next chunk
+            busy = busy or (job.future is not None and job.future.running())
+        if busy:
+            # Abandoned network calls keep their workers until they return: the next
+            # reply gets a fresh pool instead of waiting behind them
+            self.pool.shutdown(wait=False)
+            self.pool = ThreadPoolExecutor(max_workers=self.lookahead, thread_name_prefix='tts')
+        self.active.clear()
+        self.is_generating = False
         self.lock.release()
+        # Kill the player first so a feeder blocked writing to it lets go, then
+        # once more under the lock in case it spawned a fresh one meanwhile
+        self.output.stop()
+        with self.output_lock:
+            self.output.stop()
+        metrics.record('tts.stop', (time.perf_counter() - stop_start) * 1000)
 
 _global_speaker_thread = None
 def init_speaker_thread():
@@ -293,11 +505,9 @@ def init_speaker_thread():
     return _global_speaker_thread
 
 def stop_speech():
-    global _stop_requested
-    _stop_requested = True
+    global _speaking_epoch
     if _global_speaker_thread: _global_speaker_thread.stop()
+    else: _speaking_epoch += 1
 
-def speak(text):
-    global _stop_requested
-    _stop_requested = False
-    init_speaker_thread().speak(text)
+def speak(text, trace=None, filler=False, cache=True, epoch=None):
+    return init_speaker_thread().speak(text, trace, filler, cache, epoch)
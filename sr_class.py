@@ -29,13 +29,64 @@ except:
     pass
 # ---------------------
 
-from speaker import GTTSThread, is_speaking
+from speaker import GTTSThread, is_speaking, speaking_epoch
 from ai_response import get_chat_response, get_chat_response_stream
 from school_data import get_school_answer_enhanced
 import shared_state
+import metrics
+import voice_trace
 from register_face import register_name
 
 
+# Voice settings (espeak pitch/speed, gTTS accent) per persona
+PERSONA_VOICE_SETTINGS = {
+    "default": {"pitch": 50, "speed": 160, "accent": "com"},
+    "William Shakespeare": {"pitch": 45, "speed": 150, "accent": "co.uk"},
+    "NASA Scientist": {"pitch": 55, "speed": 180, "accent": "com"},
+    "a friendly Giant": {"pitch": 25, "speed": 130, "accent": "com.au"},
+    "a hyper-logical robot": {"pitch": 50, "speed": 220, "accent": "com"},
+    "a playful child": {"pitch": 80, "speed": 200, "accent": "com"},
+}
+PERSONA_RESET_REPLY = "Resetting to default OMNIS personality. How can I help you?"
+
+# Played while the LLM works on an answer
+THINKING_FILLERS = {
+    "default": [
+        "Hmm, let me think about that...",
+        "Checking my memory banks...",
+        "That's an interesting question. Let me see...",
+        "One moment, I am searching for an answer.",
+        "Let me check my school knowledge for you.",
+        "Umm, interesting..."
+    ],
+    "William Shakespeare": ["Let me consult the stars...", "A wondrous inquiry...", "Hark, let me ponder upon this..."],
+    "NASA Scientist": ["Let me process that through my calculations...", "Running data analysis...", "Analyzing trajectory..."],
+}
+
+# Fixed replies to voice commands
+NO_NAME_REPLY = "I didn't catch a name."
+SAVE_FAILED_REPLY = "Sorry, I couldn't save your name."
+NOBODY_HERE_REPLY = "I don't see anyone right now."
+NO_KNOWN_NAMES_REPLY = "I see some people, but I don't know their names."
+RESUME_REPLY = "Ok, I am listening."
+COMMAND_REPLIES = [NO_NAME_REPLY, SAVE_FAILED_REPLY, NOBODY_HERE_REPLY, NO_KNOWN_NAMES_REPLY, RESUME_REPLY]
+
+
+def persona_intro(persona):
+    return f"Initializing {persona} mode. I am ready."
+
+
+def static_phrases():
+    """(persona, text) of everything the speech thread says word for word, for pre-rendering."""
+    phrases = [("default", PERSONA_RESET_REPLY)]
+    for persona in PERSONA_VOICE_SETTINGS:
+        fillers = THINKING_FILLERS.get(persona, THINKING_FILLERS["default"])
+        phrases += [(persona, text) for text in fillers + COMMAND_REPLIES]
+        if persona != "default":
+            phrases.append((persona, persona_intro(persona)))
+    return list(dict.fromkeys(phrases))
+
+
 class SpeechRecognitionThread(threading.Thread):
     def __init__(self, speaker: GTTSThread):
         threading.Thread.__init__(self)
@@ -161,11 +212,15 @@ class SpeechRecognitionThread(threading.Thread):
                             continue
 
                         # Dynamic energy adjustment helps in noisy environments
+                        listen_start = time.perf_counter()
                         audio_data = self.recognizer.listen(
                             source, 
                             timeout=5, 
                             phrase_time_limit=15
                         )
+                        heard_at = time.perf_counter()  # end of the user's utterance
+                        metrics.record('stt.listen', (heard_at - listen_start) * 1000)
+                        trace = voice_trace.start(heard_at)
                         self.is_listening = False # Stopped listening, start processing
                         # shared_state.is_listening = False
 
@@ -175,7 +230,9 @@ class SpeechRecognitionThread(threading.Thread):
                             continue
 
                         print("🔄 Processing audio...")
-                        text = self.recognizer.recognize_google(audio_data)
+                        with metrics.timer('stt.recognize'):
+                            text = self.recognizer.recognize_google(audio_data)
+                        trace.mark('stt')
                         print(f"📝 Heard: '{text}'")
                         shared_state.last_user_text = text # Update UI
                         shared_state.last_interaction_time = time.time() # Reset cooldown
@@ -189,7 +246,7 @@ class SpeechRecognitionThread(threading.Thread):
                             greetings = {'hello', 'hi', 'hey', 'thanks', 'thank you'}
                             norm = name_spoken.lower().strip()
                             if not name_spoken or norm in greetings or len(''.join(ch for ch in norm if ch.isalpha())) < 2:
-                                self.speaker.speak("I didn't catch a name.")
+                                self.speaker.speak(NO_NAME_REPLY)
                                 shared_state.awaiting_name = False
                                 shared_state.awaiting_encoding = None
                                 shared_state.awaiting_face_image = None
@@ -198,9 +255,9 @@ class SpeechRecognitionThread(threading.Thread):
                             img = getattr(shared_state, 'awaiting_face_image', None)
                             ok = register_name(name_spoken, enc, img)
                             if ok:
-                                self.speaker.speak(f"Thanks {name_spoken}, I will remember you.")
+                                self.speaker.speak(f"Thanks {name_spoken}, I will remember you.", cache=False)
                             else:
-                                self.speaker.speak(f"Sorry, I couldn't save your name.")
+                                self.speaker.speak(SAVE_FAILED_REPLY)
                             shared_state.awaiting_name = False
                             shared_state.awaiting_encoding = None
                             shared_state.awaiting_face_image = None
@@ -233,9 +290,7 @@ class SpeechRecognitionThread(threading.Thread):
                             # 1. SILENCE / STOP
                             if any(x in question for x in ["silence", "silent", "stop talking", "shut up", "hush"]):
                                 print("\n🛑 SILENCE COMMAND DETECTED")
-                                self.speaker.stop() # Stop current thread? Or just queue?
-                                # We need a way to clear the queue in speaker.py really.
-                                # For now, we just don't reply and reset state.
+                                self.speaker.stop() # Cuts the audio and drops everything queued
                                 self.conversation_active = False 
                                 # Maybe a quick ACK?
                                 # self.speaker.speak("Ok.")
@@ -245,7 +300,7 @@ class SpeechRecognitionThread(threading.Thread):
                             if any(x in question for x in ["who is here", "who are inside", "detect people", "guess me", "who am i"]):
                                 people = getattr(shared_state, 'detected_people', [])
                                 if not people:
-                                    self.speaker.speak("I don't see anyone right now.")
+                                    self.speaker.speak(NOBODY_HERE_REPLY)
                                 else:
                                     # Filter out 'Unknown'
                                     knowns = [p for p in people if p != "Unknown"]
@@ -259,14 +314,14 @@ class SpeechRecognitionThread(threading.Thread):
                                         response_parts.append(f"and {unknown_count} unknown people.")
                                     
                                     if response_parts:
-                                        self.speaker.speak(" ".join(response_parts))
+                                        self.speaker.speak(" ".join(response_parts), cache=False)
                                     else:
-                                        self.speaker.speak("I see some people, but I don't know their names.")
+                                        self.speaker.speak(NO_KNOWN_NAMES_REPLY)
                                 continue
                                 
                             # 3. RESUME / CONTINUE
                             if any(x in question for x in ["continue", "speak again", "hello silence", "resume"]):
-                                self.speaker.speak("Ok, I am listening.")
+                                self.speaker.speak(RESUME_REPLY)
                                 self.conversation_active = True
                                 continue
 
@@ -274,34 +329,28 @@ class SpeechRecognitionThread(threading.Thread):
                             if any(x in question for x in ["act like", "be a", "expert mode", "become a"]):
                                 # Detect persona
                                 persona = "default"
-                                voice_settings = {"pitch": 50, "speed": 175, "accent": "com"}
 
                                 if "shakespeare" in question:
                                     persona = "William Shakespeare"
-                                    voice_settings = {"pitch": 45, "speed": 150, "accent": "co.uk"}
                                 elif "scientist" in question or "nasa" in question:
                                     persona = "NASA Scientist"
-                                    voice_settings = {"pitch": 55, "speed": 180, "accent": "com"}
                                 elif "giant" in question or "deep" in question:
                                     persona = "a friendly Giant"
-                                    voice_settings = {"pitch": 25, "speed": 130, "accent": "com.au"}
                                 elif "robot" in question or "monotone" in question:
                                     persona = "a hyper-logical robot"
-                                    voice_settings = {"pitch": 50, "speed": 220, "accent": "com"}
                                 elif "child" in question or "baby" in question:
                                     persona = "a playful child"
-                                    voice_settings = {"pitch": 80, "speed": 200, "accent": "com"}
                                 
                                 if persona != "default":
                                     shared_state.current_personality = persona
-                                    shared_state.current_voice_settings = voice_settings
-                                    self.speaker.speak(f"Initializing {persona} mode. I am ready.")
+                                    shared_state.current_voice_settings = PERSONA_VOICE_SETTINGS[persona]
+                                    self.speaker.speak(persona_intro(persona))
                                     continue
                             
                             if any(x in question for x in ["be yourself", "reset personality", "normal mode"]):
                                 shared_state.current_personality = "default"
-                                shared_state.current_voice_settings = {"pitch": 50, "speed": 160, "accent": "com"}
-                                self.speaker.speak("Resetting to default OMNIS personality. How can I help you?")
+                                shared_state.current_voice_settings = PERSONA_VOICE_SETTINGS["default"]
+                                self.speaker.speak(PERSONA_RESET_REPLY)
                                 continue
 
 
@@ -315,47 +364,51 @@ class SpeechRecognitionThread(threading.Thread):
                             if question and len(question) >= 3:
                                 print(f"❓ Question: {question}\n")
                                 school_ans = get_school_answer_enhanced(question)
+                                trace.route = 'school' if school_ans else 'llm'
+                                trace.mark('routed')
                                 if school_ans:
                                     print(f"🏫 School Response: {school_ans}\n")
-                                    self.speaker.speak(school_ans)
+                                    trace.mark('first_sentence')
+                                    self.speaker.speak(school_ans, trace=trace)
+                                    trace.mark('reply_done')
                                 else:
                                     print("🤖 Getting AI response...")
                                     
                                     # --- THINKING FILLERS ---
-                                    fillers = [
-                                        "Hmm, let me think about that...",
-                                        "Checking my memory banks...",
-                                        "That's an interesting question. Let me see...",
-                                        "One moment, I am searching for an answer.",
-                                        "Let me check my school knowledge for you.",
-                                        "Umm, interesting..."
-                                    ]
                                     personality = getattr(shared_state, 'current_personality', 'default')
-                                    if personality == "William Shakespeare":
-                                         fillers = ["Let me consult the stars...", "A wondrous inquiry...", "Hark, let me ponder upon this..."]
-                                    elif personality == "NASA Scientist":
-                                         fillers = ["Let me process that through my calculations...", "Running data analysis...", "Analyzing trajectory..."]
-                                    
-                                    self.speaker.speak(random.choice(fillers))
+                                    fillers = THINKING_FILLERS.get(personality, THINKING_FILLERS["default"])
+                                    # A stop (STOP gesture) while the answer streams in moves the epoch on:
+                                    # the rest of this answer is then dropped instead of played
+                                    epoch = speaking_epoch()
+                                    self.speaker.speak(random.choice(fillers), trace=trace, filler=True, epoch=epoch)
                                     
                                     active_user = getattr(shared_state, 'active_user', 'Unknown')
                                     
                                     # Use Streaming for MUCH lower latency
                                     full_reply = ""
                                     first_sentence = True
+                                    asked_at = time.perf_counter()
                                     
                                     for sentence in get_chat_response_stream(question, user_id=active_user):
+                                        if speaking_epoch() != epoch:
+                                            print("🤫 Answer interrupted")
+                                            break
                                         if first_sentence:
                                             print(f"💬 AI Starting: {sentence}")
                                             first_sentence = False
+                                            metrics.record('llm.first_sentence', (time.perf_counter() - asked_at) * 1000)
+                                            trace.mark('first_sentence')
                                         
-                                        self.speaker.speak(sentence)
+                                        # One-off text: not worth a slot in the phrase cache
+                                        self.speaker.speak(sentence, trace=trace, cache=False, epoch=epoch)
                                         full_reply += sentence + " "
                                         
                                         # Update UI and Interaction time incrementally
                                         shared_state.last_ai_text = full_reply.strip()
                                         shared_state.last_interaction_time = time.time()
                                     
+                                    metrics.record('llm.total', (time.perf_counter() - asked_at) * 1000)
+                                    trace.mark('reply_done')
                                     print(f"💬 Full Response to {active_user}: {full_reply.strip()}\n")
                                     # shared_state.last_ai_text = full_reply.strip() # Final update
                                 
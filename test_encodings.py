@@ -1,6 +1,4 @@
-import pickle
+from encoding_store import load_encodings
 print("Testing encoding file...")
-with open('images/encoded_file.p', 'rb') as f:
-    encode_list_known_with_ids = pickle.load(f)
-encode_list_known, studentIds = encode_list_known_with_ids
+encode_list_known, studentIds = load_encodings()
 print(f"Loaded {len(studentIds)} people: {studentIds}")
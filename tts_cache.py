@@ -0,0 +1,131 @@
+"""
+Persistent TTS phrase cache for OMNIS.
+
+OMNIS says the same things over and over (thinking fillers, persona
+switches, greetings, VIP intros, the fixed school answers). Synthesized
+audio is kept on disk, content-addressed by (provider, voice, persona,
+text): each clip is stored as <sha256 of the key>.mp3 in TTS_CACHE_DIR.
+Cached phrases play straight from disk, with no network round trip, and
+keep working offline.
+
+The cache is bounded by TTS_CACHE_MAX_MB with least-recently-used
+eviction. A file's mtime is its last use (bumped on every hit), so the LRU
+order survives restarts without a separate index.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+TTS_CACHE_DIR = os.environ.get('TTS_CACHE_DIR', os.path.join(BASE_DIR, 'tts_cache'))
+TTS_CACHE_MAX_MB = float(os.environ.get('TTS_CACHE_MAX_MB', '200'))
+
+
+def cache_key(provider, voice, persona, text):
+    normalized = ' '.join(text.split())
+    return hashlib.sha256(json.dumps([provider, voice, persona, normalized]).encode('utf-8')).hexdigest()
+
+
+class TTSCache:
+    def __init__(self, directory=TTS_CACHE_DIR, max_bytes=int(TTS_CACHE_MAX_MB * 1024 * 1024)):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # key -> size in bytes, least recently used first
+        self.total = 0
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+        self._scan()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.mp3')
+
+    def _scan(self):
+        found = []
+        for name in os.listdir(self.directory):
+            if not name.endswith('.mp3'):
+                continue
+            try:
+                st = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            found.append((st.st_mtime, name[:-4], st.st_size))
+        for _, key, size in sorted(found):
+            self.entries[key] = size
+            self.total += size
+        self._evict()
+
+    def _evict(self):
+        while self.total > self.max_bytes and self.entries:
+            key, size = self.entries.popitem(last=False)
+            self.total -= size
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def get(self, key):
+        """Returns the cached MP3 bytes for `key` (and marks them used), or None."""
+        with self.lock:
+            if key not in self.entries:
+                return None
+            self.entries.move_to_end(key)
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            now = time.time()
+            os.utime(path, (now, now))
+            return data
+        except OSError:
+            with self.lock:
+                self.total -= self.entries.pop(key, 0)
+            return None
+
+    def get_any(self, candidates, text):
+        """
+        candidates: (provider, voice, persona) tuples in order of preference
+        Returns: (provider, mp3 bytes) of the first cached one, or (None, None)
+        """
+        for provider, voice, persona in candidates:
+            data = self.get(cache_key(provider, voice, persona, text))
+            if data:
+                self.hits += 1
+                return provider, data
+        self.misses += 1
+        return None, None
+
+    def put(self, provider, voice, persona, text, data):
+        if not data or len(data) > self.max_bytes:
+            return
+        key = cache_key(provider, voice, persona, text)
+        path = self._path(key)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp, 'wb') as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except OSError as e:
+            print(f"⚠️ Could not write TTS cache entry: {e}")
+            return
+        with self.lock:
+            self.total += len(data) - self.entries.pop(key, 0)
+            self.entries[key] = len(data)
+            self._evict()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self.entries),
+            'size_mb': self.total / (1024 * 1024),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,182 @@
+"""
+TTS provider registry for OMNIS.
+
+Keeps track of how each TTS provider (ElevenLabs, Cartesia, edge-tts,
+gTTS) is doing and decides which ones to try for the next sentence:
+
+- providers that aren't configured (no SDK, no key) are skipped for free
+- a circuit breaker per provider: after TTS_BREAKER_FAILURES consecutive
+  failures the provider is left out for TTS_BREAKER_COOLDOWN seconds, then
+  a single request probes it again; every failed probe doubles the cooldown
+  (up to TTS_BREAKER_MAX_COOLDOWN), a successful one closes the breaker; a
+  probe that is cancelled (barge-in) or hangs past TTS_BREAKER_PROBE_TIMEOUT
+  doesn't count, and the next request probes again
+- healthy providers are tried in order of their observed time to first
+  audio (TTS_PROVIDER_ORDER=latency, the default) or in registration order
+  (TTS_PROVIDER_ORDER=fixed); providers without measurements yet follow
+  in registration order, so a fallback is only tried when the ones ahead
+  of it fail
+
+So a premium provider that has been failing for hours costs nothing beyond
+one probe per cooldown, instead of a network timeout on every sentence.
+"""
+import itertools
+import os
+import threading
+import time
+from collections import namedtuple
+
+TTS_BREAKER_FAILURES = int(os.environ.get('TTS_BREAKER_FAILURES', '1'))
+TTS_BREAKER_COOLDOWN = float(os.environ.get('TTS_BREAKER_COOLDOWN', '60'))
+TTS_BREAKER_MAX_COOLDOWN = float(os.environ.get('TTS_BREAKER_MAX_COOLDOWN', '900'))
+TTS_BREAKER_PROBE_TIMEOUT = float(os.environ.get('TTS_BREAKER_PROBE_TIMEOUT', '30'))
+TTS_PROVIDER_ORDER = os.environ.get('TTS_PROVIDER_ORDER', 'latency')
+LATENCY_SMOOTHING = 0.3
+
+CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half-open'
+
+# One claimed call. probe: id of the half-open probe this call is, 0 for an ordinary call.
+# Only the current probe moves a half-open breaker; calls that started while it was
+# closed just update the stats when they finish during someone else's probe.
+TTSCall = namedtuple("TTSCall", ["provider", "probe"])
+
+
+class TTSProvider:
+    def __init__(self, name, stream, available=None):
+        """
+        stream: text -> iterator of MP3 chunks
+        available: () -> bool, False while the provider can't be used at all (no SDK / key)
+        """
+        self.name = name
+        self.stream = stream
+        self.available = available or (lambda: True)
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.cooldown = TTS_BREAKER_COOLDOWN
+        self.open_until = 0.0
+        self.probe_started = 0.0
+        self.probe = 0  # id of the current half-open probe
+        self.calls = 0
+        self.failures = 0
+        self.first_audio = None  # smoothed seconds to the first chunk
+        self.last_error = None
+
+    def stats(self):
+        return {
+            'state': self.state,
+            'calls': self.calls,
+            'failures': self.failures,
+            'first_audio_ms': None if self.first_audio is None else self.first_audio * 1000,
+            'retry_in': max(0.0, self.open_until - time.time()) if self.state != CLOSED else 0.0,
+            'last_error': self.last_error,
+        }
+
+
+class ProviderRegistry:
+    def __init__(self, order=TTS_PROVIDER_ORDER, failures=TTS_BREAKER_FAILURES,
+                 cooldown=TTS_BREAKER_COOLDOWN, max_cooldown=TTS_BREAKER_MAX_COOLDOWN,
+                 probe_timeout=TTS_BREAKER_PROBE_TIMEOUT):
+        self.order = order
+        self.failure_threshold = max(1, failures)
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.probe_timeout = probe_timeout
+        self.providers = []
+        self.lock = threading.Lock()
+        self._probe_ids = itertools.count(1)
+
+    def register(self, name, stream, available=None):
+        provider = TTSProvider(name, stream, available)
+        provider.cooldown = self.base_cooldown
+        self.providers.append(provider)
+
+    def names(self):
+        """All providers in registration (preference) order."""
+        return [p.name for p in self.providers]
+
+    def candidates(self):
+        """Configured providers whose breaker isn't holding them back, best first."""
+        now = time.time()
+        ready = [p for p in self.providers if self._ready(p, now) and p.available()]
+        if self.order == 'latency':
+            ready.sort(key=lambda p: (p.first_audio is None, p.first_audio or 0.0))
+        return ready
+
+    def _ready(self, provider, now):
+        if provider.state == OPEN:
+            return now >= provider.open_until
+        if provider.state == HALF_OPEN:
+            return now - provider.probe_started >= self.probe_timeout  # the probe never came back
+        return True
+
+    def begin(self, provider):
+        """
+        Claims a call. An open breaker past its cooldown lets exactly one probe through.
+        Returns: a TTSCall to pass to success() / failure() / release(), or None if the provider is held back
+        """
+        with self.lock:
+            if provider.state == CLOSED:
+                return TTSCall(provider, 0)
+            now = time.time()
+            if self._ready(provider, now):
+                provider.state = HALF_OPEN
+                provider.probe_started = now
+                provider.probe = next(self._probe_ids)
+                return TTSCall(provider, provider.probe)
+            return None
+
+    def _is_probe(self, call):
+        return call.probe and call.provider.state == HALF_OPEN and call.provider.probe == call.probe
+
+    def release(self, call):
+        """
+        Ends a call. A probe that finished neither way (cancelled by a stop)
+        proves nothing: the breaker goes back to open, ready to probe again.
+        """
+        with self.lock:
+            if self._is_probe(call):
+                call.provider.state = OPEN
+
+    def success(self, call, first_audio):
+        provider = call.provider
+        with self.lock:
+            provider.calls += 1
+            if self._is_probe(call):
+                print(f"✅ TTS provider '{provider.name}' is back")
+                provider.state = CLOSED
+                provider.cooldown = self.base_cooldown
+            if provider.state == CLOSED:
+                provider.consecutive_failures = 0
+            if provider.first_audio is None:
+                provider.first_audio = first_audio
+            else:
+                provider.first_audio += LATENCY_SMOOTHING * (first_audio - provider.first_audio)
+
+    def failure(self, call, error):
+        provider = call.provider
+        with self.lock:
+            provider.calls += 1
+            provider.failures += 1
+            provider.last_error = str(error)[:200]
+            if self._is_probe(call):
+                provider.cooldown = min(self.max_cooldown, provider.cooldown * 2)
+            elif provider.state != CLOSED:
+                return  # the breaker already tripped; only its probe decides what happens next
+            else:
+                provider.consecutive_failures += 1
+                if provider.consecutive_failures < self.failure_threshold:
+                    return
+            provider.state = OPEN
+            provider.open_until = time.time() + provider.cooldown
+            print(f"⚠️ TTS provider '{provider.name}' failing ({provider.last_error}). "
+                  f"Skipping it for {provider.cooldown:.0f}s.")
+
+    def stats(self):
+        return {p.name: p.stats() for p in self.providers}
+
+    def report(self):
+        lines = []
+        for name, s in self.stats().items():
+            latency = f"{s['first_audio_ms']:.0f} ms to first audio" if s['first_audio_ms'] is not None else "no successes"
+            lines.append(f"TTS {name}: {s['state']}, {s['calls']} calls, {s['failures']} failures, {latency}")
+        return '\n'.join(lines)
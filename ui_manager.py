@@ -1,6 +1,54 @@
 import cv2
 import numpy as np
 import time
+from collections import OrderedDict
+
+SPRITE_CACHE_SIZE = 32
+SUBTITLE_ALPHA = 0.65
+
+
+def make_sprite(color_img, alpha):
+    """
+    Pre-multiplied sprite for blending: (color * alpha, 1 - alpha) as float32.
+    color_img: (h, w, 3) uint8, alpha: (h, w) float in 0..1
+    """
+    a = alpha.astype(np.float32)[:, :, None]
+    return color_img.astype(np.float32) * a, 1.0 - a
+
+
+def _clip(img, x, y, w, h):
+    """Visible part of a w x h rect at (x, y): ((x0, y0, x1, y1) in img, (sx, sy) into the sprite), or None."""
+    H, W = img.shape[:2]
+    x0, y0 = max(0, x), max(0, y)
+    x1, y1 = min(W, x + w), min(H, y + h)
+    if x1 <= x0 or y1 <= y0:
+        return None
+    return (x0, y0, x1, y1), (x0 - x, y0 - y)
+
+
+def blend_sprite(img, sprite, x, y):
+    """Alpha-blends a make_sprite() sprite into img at (x, y), touching only that rectangle."""
+    premult, inv_alpha = sprite
+    h, w = inv_alpha.shape[:2]
+    clip = _clip(img, x, y, w, h)
+    if clip is None:
+        return
+    (x0, y0, x1, y1), (sx, sy) = clip
+    sw, sh = x1 - x0, y1 - y0
+    roi = img[y0:y1, x0:x1]
+    out = roi * inv_alpha[sy:sy + sh, sx:sx + sw] + premult[sy:sy + sh, sx:sx + sw]
+    roi[...] = np.minimum(out, 255.0)
+
+
+def paste_sprite(img, sprite, x, y):
+    """Copies an opaque (h, w, 3) sprite into img at (x, y)."""
+    h, w = sprite.shape[:2]
+    clip = _clip(img, x, y, w, h)
+    if clip is None:
+        return
+    (x0, y0, x1, y1), (sx, sy) = clip
+    img[y0:y1, x0:x1] = sprite[sy:sy + (y1 - y0), sx:sx + (x1 - x0)]
+
 
 class UIManager:
     def __init__(self):
@@ -20,19 +68,20 @@ class UIManager:
         self.subtitle_timer = 0
         self.SUBTITLE_DURATION = 5 # seconds
 
+        # Pre-rendered overlays, rebuilt only when their text changes
+        self._subtitle_key = None
+        self._subtitle_sprite = None  # (sprite, x, y)
+        self._status_sprites = {}
+        self._perf_sprite = (None, None)  # (text, sprite)
+        self._tag_sprites = OrderedDict()
+
     def _load_assets(self):
         # Placeholder for loading UI assets
         # In a real scenario, we would load .png files here
         pass
 
-    def draw_status_bar(self, img, state="IDLE"):
-        """
-        Draws the system status (Listening, Speaking, etc.)
-        State: IDLE, LISTENING, PROCESSING, SPEAKING
-        """
-        # Status Box positioning (linked to camera feed at 55, 162)
-        base_x, base_y = 55, 130
-        
+    def _render_status(self, state):
+        """Pill background + label for `state`. Returns (sprite, color, show_pulse)."""
         color = (150, 150, 150)
         text = "IDLE"
         show_pulse = False
@@ -48,36 +97,44 @@ class UIManager:
             color = (0, 255, 0) # Green
             text = "SPEAKING"
 
-        # Draw pill shadow/background
-        cv2.rectangle(img, (base_x, base_y), (base_x + 200, base_y + 30), (20, 20, 20), -1)
+        # Pill shadow/background, label offset to leave room for the pulsing dot
+        sprite = np.full((31, 201, 3), 20, np.uint8)
+        text_x = 35 if show_pulse else 15
+        cv2.putText(sprite, text, (text_x, 22), self.font, 0.6, color, 1, cv2.LINE_AA)
+        return sprite, color, show_pulse
+
+    def draw_status_bar(self, img, state="IDLE"):
+        """
+        Draws the system status (Listening, Speaking, etc.)
+        State: IDLE, LISTENING, PROCESSING, SPEAKING
+        """
+        # Status Box positioning (linked to camera feed at 55, 162)
+        base_x, base_y = 55, 130
+
+        if state not in self._status_sprites:
+            self._status_sprites[state] = self._render_status(state)
+        sprite, color, show_pulse = self._status_sprites[state]
+        paste_sprite(img, sprite, base_x, base_y)
         
         # Pulsing dot for listening
         if show_pulse:
             self.pulse_phase += 0.15
             radius = int(6 + 3 * np.sin(self.pulse_phase))
             cv2.circle(img, (base_x + 15, base_y + 15), radius, color, -1)
-            text_x = base_x + 35
-        else:
-            text_x = base_x + 15
-
-        cv2.putText(img, text, (text_x, base_y + 22), self.font, 0.6, color, 1, cv2.LINE_AA)
 
-    def draw_subtitles(self, img, user_text=None, ai_text=None):
-        """
-        Draws multi-line subtitles at the bottom of the camera feed.
-        """
-        if user_text:
-            self.last_subtitle = f"You: {user_text}"
-            self.subtitle_timer = time.time() + self.SUBTITLE_DURATION
-            
-        if ai_text:
-            self.last_subtitle = f"OMNIS: {ai_text}"
-            self.subtitle_timer = time.time() + self.SUBTITLE_DURATION
-            
-        if time.time() > self.subtitle_timer:
+    def draw_perf(self, img, text):
+        """Small FPS / stage timing readout to the right of the status pill."""
+        if not text:
             return
+        if self._perf_sprite[0] != text:
+            (tw, th), _ = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, 0.45, 1)
+            sprite = np.full((31, tw + 20, 3), 20, np.uint8)
+            cv2.putText(sprite, text, (10, 20), cv2.FONT_HERSHEY_SIMPLEX, 0.45, (200, 200, 200), 1, cv2.LINE_AA)
+            self._perf_sprite = (text, sprite)
+        paste_sprite(img, self._perf_sprite[1], 55 + 210, 130)
 
-        text = self.last_subtitle
+    def _render_subtitle(self, text):
+        """Wraps `text` and renders boxes + text into one sprite. Returns (sprite, x, y) in screen coordinates."""
         cam_x, cam_y, cam_w, cam_h = 55, 162, 640, 480
         font_scale = 0.65
         thickness = 1
@@ -100,35 +157,74 @@ class UIManager:
                 current_line = word
         lines.append(current_line)
         
-        # Calculate total height for background box
         (tw_sample, th_sample), baseline = cv2.getTextSize("Ay", self.font, font_scale, thickness)
         line_height = th_sample + padding
-        total_h = len(lines) * line_height
         
-        # Draw from bottom up
+        # Lay lines out from the bottom up, in screen coordinates
         base_ty = cam_y + cam_h - 40
-        
-        # Create overlay for transparency
-        overlay = img.copy()
-        
+        placed = []
         for i, line in enumerate(reversed(lines)):
             (tw, th), _ = cv2.getTextSize(line, self.font, font_scale, thickness)
             tx = cam_x + (cam_w // 2) - (tw // 2)
             ty = base_ty - (i * line_height)
-            
+            placed.append((line, tx, ty, tw, th))
+
+        x0 = min(tx - padding for _, tx, _, _, _ in placed)
+        y0 = min(ty - th - padding for _, _, ty, _, th in placed)
+        # +1: cv2.rectangle includes its end point
+        x1 = max(tx + tw + padding for _, tx, _, tw, _ in placed) + 1
+        y1 = max(ty + padding for _, _, ty, _, _ in placed) + 1
+
+        box_mask = np.zeros((y1 - y0, x1 - x0), np.uint8)
+        text_mask = np.zeros_like(box_mask)
+        for line, tx, ty, tw, th in placed:
             # Background Rect
-            cv2.rectangle(overlay, (tx - padding, ty - th - padding), (tx + tw + padding, ty + padding // 2), (0, 0, 0), -1)
+            cv2.rectangle(box_mask, (tx - padding - x0, ty - th - padding - y0),
+                          (tx + tw + padding - x0, ty + padding // 2 - y0), 255, -1)
+            cv2.putText(text_mask, line, (tx - x0, ty - y0), self.font, font_scale, 255, thickness, cv2.LINE_AA)
+
+        # Translucent black boxes, then (anti-aliased) white text over them
+        text_alpha = text_mask.astype(np.float32) / 255.0
+        box_alpha = box_mask.astype(np.float32) / 255.0 * SUBTITLE_ALPHA
+        inv_alpha = (1.0 - box_alpha) * (1.0 - text_alpha)
+        premult = np.repeat(text_mask[:, :, None], 3, axis=2).astype(np.float32)
+        return (premult, inv_alpha[:, :, None]), x0, y0
+
+    def draw_subtitles(self, img, user_text=None, ai_text=None):
+        """
+        Draws multi-line subtitles at the bottom of the camera feed.
+        The wrapped subtitle is rendered once per text change and only its own rectangle is blended.
+        """
+        if user_text:
+            self.last_subtitle = f"You: {user_text}"
+            self.subtitle_timer = time.time() + self.SUBTITLE_DURATION
             
-        # Apply transparency
-        alpha = 0.65
-        cv2.addWeighted(overlay, alpha, img, 1 - alpha, 0, img)
-        
-        # Draw actual text on top
-        for i, line in enumerate(reversed(lines)):
-            (tw, th), _ = cv2.getTextSize(line, self.font, font_scale, thickness)
-            tx = cam_x + (cam_w // 2) - (tw // 2)
-            ty = base_ty - (i * line_height)
-            cv2.putText(img, line, (tx, ty), self.font, font_scale, (255, 255, 255), thickness, cv2.LINE_AA)
+        if ai_text:
+            self.last_subtitle = f"OMNIS: {ai_text}"
+            self.subtitle_timer = time.time() + self.SUBTITLE_DURATION
+            
+        if time.time() > self.subtitle_timer:
+            return
+
+        if self._subtitle_key != self.last_subtitle:
+            self._subtitle_key = self.last_subtitle
+            self._subtitle_sprite = self._render_subtitle(self.last_subtitle)
+        sprite, x, y = self._subtitle_sprite
+        blend_sprite(img, sprite, x, y)
+
+    def _name_tag(self, name, width, color):
+        key = (name, width, color)
+        sprite = self._tag_sprites.get(key)
+        if sprite is None:
+            sprite = np.empty((36, max(1, width), 3), np.uint8)
+            sprite[:] = color
+            cv2.putText(sprite, name, (5, 30), self.font, 0.8, (255, 255, 255), 2)
+            self._tag_sprites[key] = sprite
+            if len(self._tag_sprites) > SPRITE_CACHE_SIZE:
+                self._tag_sprites.popitem(last=False)
+        else:
+            self._tag_sprites.move_to_end(key)
+        return sprite
 
     def draw_face_box(self, img, bbox, name="Unknown", is_known=False):
         """
@@ -158,7 +254,6 @@ class UIManager:
         cv2.line(img, (x + w, y + h), (x + w - l, y + h), color, t)
         cv2.line(img, (x + w, y + h), (x + w, y + h - l), color, t)
         
-        # Name Tag
+        # Name Tag (cached per name/width)
         if is_known:
-            cv2.rectangle(img, (x, y - 35), (x + w, y), color, -1)
-            cv2.putText(img, name, (x + 5, y - 5), self.font, 0.8, (255, 255, 255), 2)
+            paste_sprite(img, self._name_tag(name, w + 1, color), x, y - 35)
@@ -0,0 +1,225 @@
+"""
+Background vision worker for OMNIS.
+
+Runs face detection/encoding/matching (plus gesture and mood) off the render
+loop. Faces are found by the backend from face_detector.py (FACE_DETECTOR)
+and followed between detections by the optical-flow tracker in
+face_tracker.py. Each track's identity is cached (identity_cache.py), so
+the 128-d encoder only runs for new tracks and periodic re-verification.
+With FACE_ENCODE_FULL_RES on (the default) detection stays on the small
+frame, but each box is cropped from the full-resolution frame for landmarks
+and encoding, so encodings aren't computed from a 128x96 thumbnail.
+Detection re-runs when a track is lost, on a slow cadence while people are
+in view (FACE_DETECT_INTERVAL) and a faster one while nobody is
+(FACE_IDLE_DETECT_INTERVAL).
+
+The render loop drops every camera frame into a single-slot mailbox;
+the worker always picks up the freshest one, so slow recognition never
+queues up stale frames or stalls `cv2.imshow`. Each result carries the
+capture timestamp of the frame it was computed from.
+"""
+import os
+import threading
+import time
+from collections import namedtuple
+
+import cv2
+import face_recognition
+
+import metrics
+from face_detector import make_detector
+from face_tracker import FaceTracker
+from emotion_manager import mood_key
+from identity_cache import IdentityCache
+
+FACE_DETECT_INTERVAL = float(os.environ.get('FACE_DETECT_INTERVAL', '1.0'))
+FACE_IDLE_DETECT_INTERVAL = float(os.environ.get('FACE_IDLE_DETECT_INTERVAL', '0.2'))
+PERCEPTION_INTERVAL = 0.1  # gesture + mood at ~10 Hz
+FACE_ENCODE_FULL_RES = os.environ.get('FACE_ENCODE_FULL_RES', '1') != '0'
+CROP_MARGIN = 0.25  # context around the box so the landmark model sees the whole face
+
+# faces: (top, right, bottom, left) boxes in small-frame coordinates
+# track_ids: stable per-person track number for each face
+# frame_shape: (h, w) of the small frame the boxes refer to
+# detected: True if the detector ran on this frame (False = boxes propagated by the tracker)
+# gesture: debounced gesture that fired this cycle (or None)
+# mood: {mood_key: mood} for faces FaceMesh fitted this cycle, None on cycles it didn't run
+VisionResult = namedtuple("VisionResult", [
+    "seq", "frame_time", "faces", "ids", "track_ids", "matches", "frame_shape",
+    "detected", "gesture", "mood", "latency",
+])
+
+
+def full_res_encodings(frame, boxes, resize_factor, margin=CROP_MARGIN):
+    """
+    Encodes faces found on the downscaled frame from crops of the full-resolution BGR `frame`.
+    boxes: (top, right, bottom, left) in small-frame coordinates
+    Returns: one 128-d encoding per box (same order)
+    """
+    h, w = frame.shape[:2]
+    up = 1.0 / resize_factor
+    encodings = []
+    for top, right, bottom, left in boxes:
+        top, right, bottom, left = top * up, right * up, bottom * up, left * up
+        pad_y, pad_x = (bottom - top) * margin, (right - left) * margin
+        y0, x0 = max(0, int(top - pad_y)), max(0, int(left - pad_x))
+        y1, x1 = min(h, int(bottom + pad_y)), min(w, int(right + pad_x))
+        crop = cv2.cvtColor(frame[y0:y1, x0:x1], cv2.COLOR_BGR2RGB)
+        loc = (int(top) - y0, int(right) - x0, int(bottom) - y0, int(left) - x0)
+        encodings.extend(face_recognition.face_encodings(crop, [loc]))
+    return encodings
+
+
+class FrameSlot:
+    """Single-slot, drop-stale mailbox: put() overwrites, take() waits for something newer."""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._frame = None
+        self._frame_time = 0.0
+        self._seq = 0
+        self.dropped = 0
+
+    def put(self, frame, frame_time=None):
+        with self._cond:
+            if self._frame is not None:
+                self.dropped += 1
+            self._frame = frame
+            self._frame_time = frame_time or time.time()
+            self._seq += 1
+            self._cond.notify()
+
+    def take(self, timeout=0.5):
+        """Returns (seq, frame_time, frame) or None on timeout. Empties the slot."""
+        with self._cond:
+            if self._frame is None:
+                self._cond.wait(timeout)
+            if self._frame is None:
+                return None
+            item = (self._seq, self._frame_time, self._frame)
+            self._frame = None
+            return item
+
+
+class VisionWorker(threading.Thread):
+    def __init__(self, gallery, gesture_man=None, emotion_man=None, resize_factor=0.20, max_faces=4):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.gallery = gallery
+        self.gesture_man = gesture_man
+        self.emotion_man = emotion_man
+        self.resize_factor = resize_factor
+        self.max_faces = max_faces
+
+        self.slot = FrameSlot()
+        self.stop_event = threading.Event()
+        self._result_lock = threading.Lock()
+        self._result = None
+        self.processed = 0
+
+        self.detector = make_detector()
+        self.tracker = FaceTracker()
+        self.identity_cache = IdentityCache()
+        self.last_detect_time = 0.0
+        self.last_perception_time = 0.0
+        self.detections = 0
+        self.encoder_calls = 0
+
+    def submit(self, frame, frame_time=None):
+        """Called from the render loop with every camera frame. Never blocks."""
+        self.slot.put(frame, frame_time)
+
+    def latest(self):
+        """Most recent VisionResult (or None before the first one)."""
+        with self._result_lock:
+            return self._result
+
+    def run(self):
+        while not self.stop_event.is_set():
+            item = self.slot.take(timeout=0.5)
+            if item is None:
+                continue
+            seq, frame_time, frame = item
+            try:
+                result = self.process(seq, frame_time, frame)
+            except Exception as e:
+                print(f"Vision Worker Error: {e}")
+                continue
+            with self._result_lock:
+                self._result = result
+            self.processed += 1
+
+    def _should_detect(self, now, lost):
+        tracks = self.tracker.tracks
+        since = now - self.last_detect_time
+        if lost or not tracks or any(t.misses for t in tracks):
+            return since >= FACE_IDLE_DETECT_INTERVAL
+        return since >= FACE_DETECT_INTERVAL
+
+    def process(self, seq, frame_time, frame):
+        imgS = cv2.resize(frame, (0, 0), None, self.resize_factor, self.resize_factor)
+        imgS = cv2.cvtColor(imgS, cv2.COLOR_BGR2RGB)
+
+        # Cheap: carry existing boxes along with optical flow
+        lost = self.tracker.update(cv2.cvtColor(imgS, cv2.COLOR_RGB2GRAY))
+
+        now = time.time()
+        detected = self._should_detect(now, lost)
+        if detected:
+            self.last_detect_time = now
+            self.detections += 1
+            # Limit faces to prevent lag
+            with metrics.timer('vision.detect'):
+                face_locs = self.detector.detect(imgS)[:self.max_faces]
+            self.tracker.reconcile(face_locs)
+            tracks = self.tracker.tracks
+            self.identity_cache.prune(t.track_id for t in tracks)
+
+            # Only new tracks and stale / jumped identities need the 128-d encoder
+            to_encode = [t for t in tracks if t.misses == 0 and self.identity_cache.needs_encoding(t, now)]
+            if to_encode:
+                boxes = [t.location() for t in to_encode]
+                with metrics.timer('vision.encode'):
+                    if FACE_ENCODE_FULL_RES:
+                        face_encs = full_res_encodings(frame, boxes, self.resize_factor)
+                    else:
+                        face_encs = face_recognition.face_encodings(imgS, boxes)
+                self.encoder_calls += len(to_encode)
+                # One matrix operation for all of them
+                for track, match in zip(to_encode, self.gallery.match(face_encs)):
+                    entry = self.identity_cache.update(track.track_id, match, self.gallery.tolerance, now)
+                    track.person_id, track.match = entry.person_id, entry.match
+
+        tracks = self.tracker.tracks
+        gesture, moods = None, None
+        if (self.gesture_man or self.emotion_man) and now - self.last_perception_time >= PERCEPTION_INTERVAL:
+            self.last_perception_time = now
+            rgb_img = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            if self.gesture_man:
+                with metrics.timer('vision.gesture'):
+                    gesture = self.gesture_man.detect_gesture(rgb_img)
+            if self.emotion_man:
+                up = 1.0 / self.resize_factor
+                faces = [(mood_key(t.person_id, t.track_id), tuple(int(v * up) for v in t.location()))
+                         for t in tracks]
+                with metrics.timer('vision.emotion'):
+                    moods = self.emotion_man.detect_emotions(rgb_img, faces)
+
+        latency = time.time() - frame_time
+        metrics.record('vision.latency', latency * 1000)
+        return VisionResult(
+            seq=seq,
+            frame_time=frame_time,
+            faces=[t.location() for t in tracks],
+            ids=[t.person_id for t in tracks],
+            track_ids=[t.track_id for t in tracks],
+            matches=[t.match for t in tracks],
+            frame_shape=imgS.shape[:2],
+            detected=detected,
+            gesture=gesture,
+            mood=moods,
+            latency=latency,
+        )
+
+    def stop(self):
+        self.stop_event.set()
@@ -0,0 +1,119 @@
+"""
+End-to-end voice latency tracing for OMNIS.
+
+What the user feels is the gap between finishing their sentence and hearing
+OMNIS start to answer. Each utterance gets a VoiceTrace when the
+microphone stops listening; the trace is handed along with the text it
+produced (SpeechRecognitionThread -> school lookup / Gemini stream ->
+GTTSThread synthesis -> playback) and every component marks the hop it
+finished:
+
+    speech_end      listen() returned (end of the user's speech, t = 0)
+    stt             recognize_google() returned the text
+    routed          school lookup done; answer comes from the school data or the LLM
+    filler_audio    a thinking filler started playing
+    first_sentence  first sentence of the answer is ready
+    synth_start     first answer sentence picked up for synthesis
+    first_chunk     first MP3 chunk of the first answer sentence arrived
+    first_audio     first answer sentence started playing (the trace is complete)
+    reply_done      the whole answer has been generated
+
+Only the first mark of each hop counts. Every mark also goes to the metrics
+histogram "voice.<hop>" (ms since speech_end); `report()` summarizes the
+completed traces of the session.
+"""
+import itertools
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+import metrics
+
+HOPS = ('speech_end', 'stt', 'routed', 'filler_audio', 'first_sentence',
+        'synth_start', 'first_chunk', 'first_audio', 'reply_done')
+TRACE_HISTORY = 500
+
+_ids = itertools.count(1)
+_completed = deque(maxlen=TRACE_HISTORY)
+_lock = threading.Lock()
+
+
+class VoiceTrace:
+    def __init__(self, trace_id, speech_end=None):
+        self.trace_id = trace_id
+        self.wall_time = time.time()
+        self.route = None  # 'school' or 'llm'
+        self.hops = {'speech_end': speech_end or time.perf_counter()}
+
+    def mark(self, hop, t=None):
+        """Records `hop` at perf_counter() time `t` (default now). Returns False if it was already marked."""
+        if hop in self.hops:
+            return False
+        self.hops[hop] = t or time.perf_counter()
+        metrics.record(f"voice.{hop}", (self.hops[hop] - self.hops['speech_end']) * 1000)
+        if hop == 'first_audio':
+            with _lock:
+                _completed.append(self)
+            print(f"⏱️ [{self.trace_id}] speech end -> first audio {self.elapsed_ms()['first_audio']:.0f} ms "
+                  f"({self.breakdown()})")
+        return True
+
+    def elapsed_ms(self):
+        """{hop: ms since speech_end} for the hops marked so far."""
+        start = self.hops['speech_end']
+        return {hop: (self.hops[hop] - start) * 1000 for hop in HOPS if hop in self.hops}
+
+    def breakdown(self):
+        """'stt 800 | routed 3 | ...': ms spent in each hop since the previous one."""
+        parts, prev = [], self.hops['speech_end']
+        for hop in HOPS[1:]:
+            if hop in self.hops and hop != 'filler_audio':
+                parts.append(f"{hop} {(self.hops[hop] - prev) * 1000:.0f}")
+                prev = self.hops[hop]
+        return ' | '.join(parts)
+
+
+def start(speech_end=None):
+    """Starts the trace of a new utterance; `speech_end` is the perf_counter() time listening stopped."""
+    return VoiceTrace(f"u{next(_ids)}", speech_end)
+
+
+def mark(trace, hop, t=None):
+    """trace.mark(hop) that accepts trace=None, for components called with or without a trace."""
+    if trace is not None:
+        trace.mark(hop, t)
+
+
+def completed():
+    with _lock:
+        return list(_completed)
+
+
+def summary():
+    """{hop: {count, p50, p95, mean}} in ms since speech_end, over completed traces."""
+    traces = completed()
+    report = {}
+    for hop in HOPS[1:]:
+        values = [t.elapsed_ms()[hop] for t in traces if hop in t.hops]
+        if values:
+            p50, p95 = np.percentile(values, (50, 95))
+            report[hop] = {'count': len(values), 'p50': float(p50), 'p95': float(p95),
+                           'mean': float(np.mean(values))}
+    return report
+
+
+def report():
+    traces = completed()
+    if not traces:
+        return "No completed voice traces."
+    lines = [f"Voice latency over {len(traces)} answers (ms since end of speech)",
+             f"{'hop':<16}{'count':>7}{'p50':>9}{'p95':>9}{'mean':>9}"]
+    for hop, s in summary().items():
+        lines.append(f"{hop:<16}{s['count']:>7}{s['p50']:>9.0f}{s['p95']:>9.0f}{s['mean']:>9.0f}")
+    for route in ('school', 'llm'):
+        values = [t.elapsed_ms()['first_audio'] for t in traces if t.route == route]
+        if values:
+            lines.append(f"first audio via {route}: p50 {np.percentile(values, 50):.0f} ms over {len(values)} answers")
+    return '\n'.join(lines)
@@ -0,0 +1,97 @@
+"""
+Pre-render OMNIS's fixed phrases into the TTS phrase cache (tts_cache.py).
+
+Renders, in the voice they are spoken in:
+- thinking fillers, persona switch lines and voice command replies (sr_class.py)
+- VIP intros, the unknown-visitor greeting and, for every enrolled person,
+  their formal and casual greetings (greeting_manager.py)
+- every fixed answer in school_data.SCHOOL_METADATA
+
+Phrases already in the cache are skipped, so it is cheap to re-run after
+enrolling people. Once warmed, these play without a network round trip,
+also offline.
+
+Usage: python warm_tts_cache.py [--no-names] [--dry-run]
+"""
+import argparse
+import time
+
+import shared_state
+from greeting_manager import GreetingManager
+from school_data import SCHOOL_METADATA
+from speaker import cached_stream_tts, speech_units, split_text_to_sentences
+from sr_class import PERSONA_VOICE_SETTINGS, static_phrases
+from tts_cache import TTSCache
+
+
+def school_answers():
+    """The answer get_school_response() gives for each entry (its first non-None one)."""
+    answers = []
+    for entry in SCHOOL_METADATA:
+        ans = next((a for a in entry.get('answer', []) if a is not None), None)
+        if ans:
+            answers.append(ans)
+    return answers
+
+
+def collect_phrases(names=()):
+    """(persona, text) pairs to render, deduplicated."""
+    phrases = list(static_phrases())
+    phrases += [("default", text) for text in GreetingManager().static_greetings(names)]
+    phrases += [("default", text) for text in school_answers()]
+    return list(dict.fromkeys(phrases))
+
+
+def enrolled_names():
+    try:
+        from encoding_store import load_encodings
+        return list(dict.fromkeys(load_encodings()[1]))
+    except Exception as e:
+        print(f"⚠️ Could not load enrolled names ({e}). Skipping personal greetings.")
+        return []
+
+
+def warm(phrases, cache, dry_run=False):
+    counts = {'cached': 0, 'rendered': 0, 'failed': 0}
+    for persona, phrase in phrases:
+        shared_state.current_personality = persona
+        shared_state.current_voice_settings = PERSONA_VOICE_SETTINGS.get(persona, PERSONA_VOICE_SETTINGS["default"])
+        # speak() synthesizes long text sentence by sentence; greetings grow past that limit with
+        # a memory follow-up, so their sentences are rendered on their own as well
+        for text in dict.fromkeys(speech_units(phrase) + split_text_to_sentences(phrase)):
+            if dry_run:
+                print(f"  [{persona}] {text}")
+                continue
+            start = time.time()
+            provider = None
+            for provider, _ in cached_stream_tts(text, cache):
+                pass
+            if provider == 'cache':
+                counts['cached'] += 1
+            elif provider:
+                counts['rendered'] += 1
+                print(f"✓ {provider:<10} {time.time() - start:5.1f}s  [{persona}] {text}")
+            else:
+                counts['failed'] += 1
+                print(f"✗ no provider rendered [{persona}] {text}")
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--no-names', action='store_true', help="skip personal greetings for enrolled people")
+    parser.add_argument('--dry-run', action='store_true', help="list the phrases without rendering them")
+    args = parser.parse_args()
+
+    phrases = collect_phrases([] if args.no_names else enrolled_names())
+    print(f"{len(phrases)} phrases to warm")
+    cache = TTSCache()
+    counts = warm(phrases, cache, dry_run=args.dry_run)
+    if not args.dry_run:
+        stats = cache.stats()
+        print(f"\n{counts['rendered']} rendered, {counts['cached']} already cached, {counts['failed']} failed. "
+              f"Cache: {stats['entries']} clips, {stats['size_mb']:.1f} MB in {cache.directory}")
+
+
+if __name__ == '__main__':
+    main()